@@ -0,0 +1,318 @@
+"""Streaming speech recognition over Riva StreamingRecognize
+
+    python asr_client.py test02.m4a --language en-US
+    python asr_client.py --eval --realtime          # test01/test02 against their .txt transcripts
+    NVIDIA_SERVER=localhost:50051 NVIDIA_USE_SSL=0 python asr_client.py --eval
+
+Audio is decoded in memory to 16 kHz mono 16-bit PCM: with PyAV when it is
+installed, otherwise by an ffmpeg process whose output is read from a pipe.
+WAV files that are already in that format are streamed as-is. Nothing is
+written to disk.
+"""
+import argparse
+import io
+import os
+import subprocess
+import sys
+import threading
+import time
+import wave
+from collections import namedtuple
+
+import grpc
+
+import riva_protos
+from lang_segment import detect_language, tokenize
+from riva_pool import auth_metadata, env_flag, get_channel
+
+riva_asr_pb2, riva_asr_pb2_grpc = riva_protos.asr()
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Same defaults server.js uses for its /api/nvidia/v1/asr endpoint
+DEFAULT_SERVER_URL = "grpc.nvcf.nvidia.com:443"
+DEFAULT_ASR_FUNCTION_ID = "b702f636-f60c-4a3d-a6f4-f3568c13bd7d"
+
+SAMPLE_RATE = 16000
+CHUNK_MS = 100
+
+# One result from the server; elapsed is seconds since the stream was opened
+Transcript = namedtuple("Transcript", "text is_final stability elapsed")
+
+
+def endpoint_from_env():
+    """(server_url, function_id, use_ssl) for the ASR API"""
+    return (
+        os.getenv("NVIDIA_SERVER", DEFAULT_SERVER_URL),
+        os.getenv("NVIDIA_FUNCTION_ID", DEFAULT_ASR_FUNCTION_ID),
+        env_flag("NVIDIA_USE_SSL", True),
+    )
+
+
+def _read_wav(source, sample_rate):
+    """PCM frames of a WAV that needs no conversion, or None"""
+    try:
+        reader = wave.open(io.BytesIO(source) if isinstance(source, bytes) else source, "rb")
+    except (wave.Error, EOFError):
+        return None
+    if reader.getframerate() != sample_rate or reader.getnchannels() != 1 or reader.getsampwidth() != 2:
+        reader.close()
+        return None
+
+    def frames():
+        with reader:
+            while True:
+                block = reader.readframes(sample_rate // 2)
+                if not block:
+                    return
+                yield block
+
+    return frames()
+
+
+def _decode_av(av, source, sample_rate):
+    container = av.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+    resampler = av.AudioResampler(format="s16", layout="mono", rate=sample_rate)
+    with container:
+        for frame in container.decode(audio=0):
+            for out in resampler.resample(frame):
+                # Planes can be padded past the last sample
+                yield bytes(out.planes[0])[:out.samples * 2]
+        for out in resampler.resample(None):
+            yield bytes(out.planes[0])[:out.samples * 2]
+
+
+def _decode_ffmpeg(source, sample_rate):
+    command = ["ffmpeg", "-v", "error", "-i", "pipe:0" if isinstance(source, bytes) else source,
+               "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "pipe:1"]
+    try:
+        process = subprocess.Popen(command, stdin=subprocess.PIPE if isinstance(source, bytes) else subprocess.DEVNULL,
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except FileNotFoundError:
+        raise RuntimeError("Decoding compressed audio needs PyAV (pip install av) or ffmpeg on PATH")
+
+    if isinstance(source, bytes):
+        # Feed stdin from a thread so a full stdout pipe can't deadlock us
+        def feed():
+            try:
+                process.stdin.write(source)
+            except BrokenPipeError:
+                pass
+            finally:
+                process.stdin.close()
+        threading.Thread(target=feed, daemon=True).start()
+
+    try:
+        while True:
+            block = process.stdout.read(sample_rate)
+            if not block:
+                break
+            yield block
+    finally:
+        process.stdout.close()
+        error = process.stderr.read().decode("utf-8", "replace").strip()
+        process.stderr.close()
+        if process.wait() != 0 and error:
+            raise RuntimeError(f"ffmpeg failed: {error}")
+
+
+def decode_audio(source, sample_rate=SAMPLE_RATE):
+    """Yield 16-bit mono PCM blocks at sample_rate from a file path or the file's bytes"""
+    frames = _read_wav(source, sample_rate)
+    if frames is not None:
+        return frames
+    try:
+        import av
+    except ImportError:
+        return _decode_ffmpeg(source, sample_rate)
+    return _decode_av(av, source, sample_rate)
+
+
+def iter_chunks(blocks, chunk_bytes):
+    """Re-slice PCM blocks into chunk_bytes pieces (the last one may be shorter)"""
+    buffer = bytearray()
+    for block in blocks:
+        buffer += block
+        while len(buffer) >= chunk_bytes:
+            yield bytes(buffer[:chunk_bytes])
+            del buffer[:chunk_bytes]
+    if buffer:
+        yield bytes(buffer)
+
+
+class ASRClient:
+    """StreamingRecognize calls over a shared channel"""
+
+    def __init__(self, channel, metadata, deadline=600.0):
+        self.stub = riva_asr_pb2_grpc.RivaSpeechRecognitionStub(channel)
+        self.metadata = metadata
+        self.deadline = deadline
+
+    def stream(self, chunks, language_code="multi", sample_rate=SAMPLE_RATE, interim_results=True,
+               realtime=False):
+        """Send PCM chunks and yield a Transcript for every result as it arrives
+
+        With realtime, chunks are paced to the audio clock like a live microphone.
+        """
+        config = riva_asr_pb2.RecognitionConfig(
+            encoding=riva_asr_pb2.RecognitionConfig.LINEAR_PCM,
+            sample_rate_hertz=sample_rate,
+            language_code=language_code,
+            max_alternatives=1,
+            enable_automatic_punctuation=True,
+            audio_channel_count=1,
+        )
+        start = time.perf_counter()
+        upload_errors = []
+
+        def requests():
+            yield riva_asr_pb2.StreamingRecognizeRequest(streaming_config=riva_asr_pb2.StreamingRecognizeConfig(
+                config=config, interim_results=interim_results))
+            sent_seconds = 0.0
+            try:
+                for chunk in chunks:
+                    if realtime:
+                        ahead = start + sent_seconds - time.perf_counter()
+                        if ahead > 0:
+                            time.sleep(ahead)
+                        sent_seconds += len(chunk) / (2.0 * sample_rate)
+                    yield riva_asr_pb2.StreamingRecognizeRequest(audio_content=chunk)
+            except Exception as e:
+                # gRPC only reports a cancelled call; keep the decoder's error for the caller
+                upload_errors.append(e)
+                raise
+
+        responses = self.stub.StreamingRecognize(requests(), timeout=self.deadline, metadata=self.metadata)
+        try:
+            for response in responses:
+                results = list(response.results)
+                if not results and response.HasField("result"):
+                    results = [response.result]
+                for result in results:
+                    if result.alternatives:
+                        yield Transcript(result.alternatives[0].transcript, result.is_final, result.stability,
+                                         time.perf_counter() - start)
+        except grpc.RpcError:
+            if upload_errors:
+                raise upload_errors[0]
+            raise
+        finally:
+            # Stop the upload if the caller stopped listening early
+            responses.cancel()
+
+
+def get_asr_client(api_key, deadline=600.0):
+    """ASR client for the configured endpoint, on the process-wide channel"""
+    server_url, function_id, use_ssl = endpoint_from_env()
+    return ASRClient(get_channel(server_url, use_ssl), auth_metadata(function_id, api_key), deadline)
+
+
+def transcribe(client, source, language_code="multi", chunk_ms=CHUNK_MS, realtime=False, interim_results=True,
+               on_result=None):
+    """Stream an audio file through client; returns (final_text, first_partial_s, final_s)"""
+    chunk_bytes = SAMPLE_RATE * 2 * chunk_ms // 1000
+    chunks = iter_chunks(decode_audio(source), chunk_bytes)
+    joiner = "" if language_code.lower().startswith("zh") else " "
+    finals = []
+    first_partial = last_final = None
+    for result in client.stream(chunks, language_code, interim_results=interim_results, realtime=realtime):
+        if first_partial is None:
+            first_partial = result.elapsed
+        if result.is_final:
+            finals.append(result.text.strip())
+            last_final = result.elapsed
+        if on_result:
+            on_result(result)
+    return joiner.join(text for text in finals if text), first_partial, last_final
+
+
+def edit_distance(reference, hypothesis):
+    """Levenshtein distance between two sequences"""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_item in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_item in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_item != hyp_item)))
+        previous = current
+    return previous[-1]
+
+
+def error_rates(reference, hypothesis):
+    """(CER, WER) of hypothesis against reference, ignoring case, spacing and punctuation"""
+    ref_words, hyp_words = tokenize(reference), tokenize(hypothesis)
+    ref_chars, hyp_chars = "".join(ref_words), "".join(hyp_words)
+    cer = edit_distance(ref_chars, hyp_chars) / max(1, len(ref_chars))
+    wer = edit_distance(ref_words, hyp_words) / max(1, len(ref_words))
+    return cer, wer
+
+
+def print_result(result):
+    """Print one streaming result with its time since the audio started"""
+    print(f"  {result.elapsed:7.2f}s {'final  ' if result.is_final else 'partial'} {result.text}")
+
+
+def evaluate(client, pairs, language=None, chunk_ms=CHUNK_MS, realtime=False, verbose=False):
+    """Transcribe each (audio, reference_text_file) pair and print accuracy and latency"""
+    for audio_file, reference_file in pairs:
+        with open(reference_file, "r", encoding="utf-8") as f:
+            reference = f.read().strip()
+        language_code = language or detect_language(reference)
+        start = time.perf_counter()
+        hypothesis, first_partial, final = transcribe(client, audio_file, language_code, chunk_ms, realtime,
+                                                      on_result=print_result if verbose else None)
+        elapsed = time.perf_counter() - start
+        cer, wer = error_rates(reference, hypothesis)
+        print(f"{os.path.basename(audio_file)} [{language_code}]  CER {cer:.1%}  WER {wer:.1%}  "
+              f"first partial {first_partial * 1000 if first_partial is not None else float('nan'):.0f} ms  "
+              f"final {final if final is not None else float('nan'):.2f}s  total {elapsed:.2f}s")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Stream audio files to Riva ASR and print transcripts")
+    parser.add_argument("audio", nargs="*", help="Audio files (m4a, wav, ...)")
+    parser.add_argument("--language", help="Language code (default: multi; --eval detects it from the reference)")
+    parser.add_argument("--chunk-ms", type=int, default=CHUNK_MS, help="Audio per streamed request")
+    parser.add_argument("--realtime", action="store_true", help="Pace audio at playback speed like a live source")
+    parser.add_argument("--no-interim", action="store_true", help="Only print final results")
+    parser.add_argument("--eval", action="store_true",
+                        help="Score against the .txt next to each audio file (default: test01/test02)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="In --eval, print every result")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    from dotenv import load_dotenv
+    load_dotenv()
+    api_key = os.getenv("NVIDIA_API_KEY")
+    if not api_key:
+        print("NVIDIA_API_KEY is not set")
+        return 2
+    client = get_asr_client(api_key)
+
+    try:
+        if args.eval:
+            audio_files = args.audio or [os.path.join(HERE, "test01.m4a"), os.path.join(HERE, "test02.m4a")]
+            pairs = [(path, os.path.splitext(path)[0] + ".txt") for path in audio_files]
+            evaluate(client, pairs, args.language, args.chunk_ms, args.realtime, args.verbose)
+            return 0
+
+        if not args.audio:
+            print("No audio files given")
+            return 2
+        for audio_file in args.audio:
+            print(f"{audio_file}:")
+            text, _, _ = transcribe(client, audio_file, args.language or "multi", args.chunk_ms, args.realtime,
+                                    interim_results=not args.no_interim, on_result=print_result)
+            print(text)
+    except grpc.RpcError as e:
+        print(f"ASR request failed: {e.code().name} {e.details()}")
+        return 1
+    except RuntimeError as e:
+        print(e)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
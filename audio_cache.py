@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import unicodedata
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    """Canonical form of a sentence for cache keys: NFKC, collapsed whitespace"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+_fingerprints = {}
+_fingerprints_lock = threading.Lock()
+
+
+def model_fingerprint(model_file):
+    """SHA-256 of a model file, memoized by path, size and mtime"""
+    stat = os.stat(model_file)
+    memo_key = (os.path.abspath(model_file), stat.st_size, stat.st_mtime)
+    with _fingerprints_lock:
+        if memo_key in _fingerprints:
+            return _fingerprints[memo_key]
+    digest = hashlib.sha256()
+    with open(model_file, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    with _fingerprints_lock:
+        _fingerprints[memo_key] = digest.hexdigest()
+    return _fingerprints[memo_key]
+
+
+class SegmentCache:
+    """Content-addressed on-disk cache of synthesized PCM segments
+
+    Entries are written to a temp file and renamed into place, so several
+    processes can share one directory. Reads touch the file's mtime, and
+    eviction removes the least recently used files once max_bytes is exceeded.
+    """
+
+    SUFFIX = ".pcm"
+
+    def __init__(self, cache_dir, max_bytes=1024 * 1024 * 1024, log=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.log = log or (lambda message: None)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._bytes = sum(size for _, size, _ in self._scan())
+
+    @staticmethod
+    def key(text, backend, sample_rate, params=None):
+        """Cache key for a sentence rendered by backend at sample_rate with params"""
+        payload = json.dumps(
+            [normalize_text(text), backend, int(sample_rate), params or {}],
+            sort_keys=True, ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + self.SUFFIX)
+
+    def get(self, key):
+        """Cached PCM bytes for key, or None"""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                pcm = f.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return pcm
+
+    def put(self, key, pcm):
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(pcm)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            self._bytes += len(pcm)
+            over = self.max_bytes is not None and self._bytes > self.max_bytes
+        if over:
+            self.evict()
+
+    def _scan(self):
+        """(path, size, mtime) of every entry on disk"""
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(self.SUFFIX):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue  # Removed by another process
+                    yield entry.path, stat.st_size, stat.st_mtime
+
+    def evict(self):
+        """Remove least recently used entries until the cache is at 90% of max_bytes"""
+        entries = sorted(self._scan(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        removed = 0
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+            removed += 1
+        with self._lock:
+            self._bytes = total
+        self.log(f"Segment cache evicted {removed} entries ({total / 1e6:.1f}MB left)")
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats_text(self):
+        return (f"hits={self.hits} misses={self.misses} hit_rate={self.hit_rate():.0%} "
+                f"size={self._bytes / 1e6:.1f}MB")
+
+
+def piper_params(voice):
+    """Synthesis settings of a loaded PiperVoice that change its audio, for SegmentCache.key"""
+    config = voice.config
+    return {
+        "noise_scale": config.noise_scale,
+        "length_scale": config.length_scale,
+        "noise_w": config.noise_w_scale,
+        "speaker_id": getattr(config, "default_speaker_id", 0) if config.num_speakers > 1 else None,
+    }
+
+
+_segment_cache = None
+_segment_cache_lock = threading.Lock()
+
+
+def get_segment_cache():
+    """Process-wide segment cache configured from the environment, or None if disabled
+
+    TTS_CACHE=0 disables it, TTS_CACHE_DIR sets the directory (default ./cache/segments)
+    and TTS_CACHE_MB the size cap.
+    """
+    global _segment_cache
+    if os.getenv("TTS_CACHE", "1").strip().lower() in ("0", "false", "no", "off"):
+        return None
+    with _segment_cache_lock:
+        if _segment_cache is None:
+            cache_dir = os.getenv("TTS_CACHE_DIR", os.path.join(os.getcwd(), "cache", "segments"))
+            max_mb = float(os.getenv("TTS_CACHE_MB", "1024"))
+            _segment_cache = SegmentCache(cache_dir, max_bytes=int(max_mb * 1e6))
+        return _segment_cache
@@ -0,0 +1,240 @@
+import os
+import time
+import wave
+
+# Output format -> file extension; open_writer picks the format from the extension
+FORMATS = {"wav": ".wav", "flac": ".flac", "opus": ".opus"}
+
+# Sample rates the Opus codec accepts; other rates are resampled to 48 kHz
+OPUS_RATES = (8000, 12000, 16000, 24000, 48000)
+
+
+def format_for_path(path):
+    """Output format for a file name, by extension"""
+    extension = os.path.splitext(path)[1].lower()
+    for name, format_extension in FORMATS.items():
+        if extension == format_extension:
+            return name
+    raise ValueError(f"Unsupported output format: {extension or path}")
+
+
+class StreamingResampler:
+    """Sample rate conversion of a 16-bit mono PCM stream, one block at a time
+
+    Uses soxr when installed; otherwise linear interpolation with NumPy. When
+    reducing the rate, the fallback first runs a windowed-sinc low-pass just
+    below the new Nyquist frequency so the interpolation doesn't alias.
+    """
+
+    # Half-length of the fallback's anti-aliasing filter, in input samples
+    LOWPASS_HALF_TAPS = 32
+
+    def __init__(self, in_rate, out_rate):
+        import numpy as np
+        self._np = np
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        try:
+            import soxr
+            self._soxr = soxr.ResampleStream(in_rate, out_rate, 1, dtype="int16")
+        except ImportError:
+            self._soxr = None
+            self._step = in_rate / out_rate
+            self._position = 0.0  # next output sample, in input samples from the start of _pending
+            self._pending = np.zeros(0, dtype=np.float32)
+            self._taps = None
+            if out_rate < in_rate:
+                half = self.LOWPASS_HALF_TAPS
+                # Cutoff at 90% of the output Nyquist frequency, in cycles per input sample
+                cutoff = 0.45 * out_rate / in_rate
+                n = np.arange(-half, half + 1)
+                taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(len(n))
+                self._taps = (taps / taps.sum()).astype(np.float32)
+                self._history = np.zeros(2 * half, dtype=np.float32)
+                self._delay = half  # filter output samples to drop so the audio isn't shifted
+
+    def _lowpass(self, samples):
+        np = self._np
+        extended = np.concatenate((self._history, samples))
+        filtered = np.convolve(extended, self._taps, mode="valid").astype(np.float32)
+        self._history = extended[len(extended) - len(self._history):]
+        if self._delay:
+            dropped = min(self._delay, len(filtered))
+            filtered = filtered[dropped:]
+            self._delay -= dropped
+        return filtered
+
+    def _interpolate(self, samples):
+        np = self._np
+        source = np.concatenate((self._pending, samples))
+        if len(source) < 2:
+            self._pending = source
+            return b""
+        # Interpolate every output instant that falls inside this block
+        count = int(np.floor((len(source) - 1 - self._position) / self._step)) + 1
+        positions = self._position + self._step * np.arange(max(0, count))
+        out = np.interp(positions, np.arange(len(source)), source)
+        # Keep the last input sample so the next block continues seamlessly
+        self._position += self._step * max(0, count) - (len(source) - 1)
+        self._pending = source[-1:]
+        return np.clip(np.rint(out), -32768, 32767).astype("<i2").tobytes()
+
+    def process(self, pcm, last=False):
+        np = self._np
+        samples = np.frombuffer(pcm, dtype="<i2")
+        if self._soxr is not None:
+            return self._soxr.resample_chunk(samples, last=last).astype("<i2").tobytes()
+        samples = samples.astype(np.float32)
+        if self._taps is not None:
+            samples = self._lowpass(samples)
+        return self._interpolate(samples)
+
+    def flush(self):
+        if self._soxr is not None:
+            return self.process(b"", last=True)
+        if self._taps is not None:
+            # Push the filter's delay line out with silence
+            return self._interpolate(self._lowpass(self._np.zeros(self.LOWPASS_HALF_TAPS, dtype=self._np.float32)))
+        return b""
+
+
+class AudioWriter:
+    """Incremental 16-bit mono PCM writer; subclasses encode and store the audio
+
+    PCM is resampled to target_rate on the way in when that differs from
+    sample_rate. Time spent converting, encoding and writing is accumulated so
+    callers can weigh it against the bytes saved compared with writing the
+    incoming PCM as a plain WAV.
+    """
+
+    format_name = None
+
+    def __init__(self, path, sample_rate, target_rate=None, on_first_write=None):
+        self.path = path
+        self.in_rate = sample_rate
+        self.out_rate = target_rate or sample_rate
+        self.pcm_bytes = 0  # incoming 16-bit PCM, i.e. what a WAV at sample_rate would hold
+        self.encode_seconds = 0.0
+        self._on_first_write = on_first_write
+        self._resampler = StreamingResampler(sample_rate, self.out_rate) if self.out_rate != sample_rate else None
+
+    def write(self, pcm):
+        start = time.perf_counter()
+        self.pcm_bytes += len(pcm)
+        if self._resampler is not None:
+            pcm = self._resampler.process(pcm)
+        if pcm:
+            self._write(pcm)
+        self.encode_seconds += time.perf_counter() - start
+        if self._on_first_write is not None:
+            self._on_first_write()
+            self._on_first_write = None
+
+    def close(self):
+        start = time.perf_counter()
+        if self._resampler is not None:
+            tail = self._resampler.flush()
+            if tail:
+                self._write(tail)
+        self._close()
+        self.encode_seconds += time.perf_counter() - start
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def stats(self):
+        """Size and cost of the finished file versus the incoming audio as 16-bit WAV"""
+        file_bytes = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        audio_seconds = self.pcm_bytes / 2.0 / self.in_rate
+        return {
+            "format": self.format_name,
+            "sample_rate": self.out_rate,
+            "audio_seconds": audio_seconds,
+            "file_bytes": file_bytes,
+            "wav_bytes": self.pcm_bytes + 44,
+            "encode_seconds": self.encode_seconds,
+        }
+
+    def report(self):
+        stats = self.stats()
+        saved = 1 - stats["file_bytes"] / stats["wav_bytes"]
+        cost = stats["encode_seconds"] / stats["audio_seconds"] if stats["audio_seconds"] else 0.0
+        return (f"{stats['format'].upper()} {stats['sample_rate']} Hz: {stats['file_bytes'] / 1e6:.2f} MB "
+                f"vs {stats['wav_bytes'] / 1e6:.2f} MB WAV ({saved:.0%} smaller), "
+                f"encode {stats['encode_seconds']:.3f}s ({cost:.2%} of audio length)")
+
+
+class StreamingWavWriter(AudioWriter):
+    """16-bit mono WAV writer that keeps the file playable after every append
+
+    wave patches the header on each writeframes call; flushing the underlying
+    file makes the partial audio visible to other readers while a job runs.
+    """
+
+    format_name = "wav"
+
+    def __init__(self, output_wav, sample_rate, target_rate=None, on_first_write=None):
+        super().__init__(output_wav, sample_rate, target_rate, on_first_write)
+        self._file = open(output_wav, "wb")
+        self._wav = wave.open(self._file, "wb")
+        self._wav.setnchannels(1)
+        self._wav.setsampwidth(2)
+        self._wav.setframerate(self.out_rate)
+
+    def _write(self, pcm):
+        self._wav.writeframes(pcm)
+        self._file.flush()
+
+    def _close(self):
+        self._wav.close()
+        self._file.close()
+
+
+class SoundFileWriter(AudioWriter):
+    """FLAC or Ogg/Opus encoded block by block through libsndfile"""
+
+    # format name -> (libsndfile container, subtype)
+    SUBTYPES = {"flac": ("FLAC", "PCM_16"), "opus": ("OGG", "OPUS")}
+
+    def __init__(self, path, sample_rate, format_name, target_rate=None, on_first_write=None):
+        try:
+            import soundfile
+        except ImportError:
+            raise RuntimeError(f"{format_name.upper()} output needs soundfile: pip install soundfile")
+        if format_name == "opus" and (target_rate or sample_rate) not in OPUS_RATES:
+            target_rate = 48000
+        super().__init__(path, sample_rate, target_rate, on_first_write)
+        self.format_name = format_name
+        container, subtype = self.SUBTYPES[format_name]
+        try:
+            self._file = soundfile.SoundFile(path, "w", samplerate=self.out_rate, channels=1,
+                                             format=container, subtype=subtype)
+        except (RuntimeError, ValueError) as e:
+            # Opus needs libsndfile 1.0.29 or newer
+            raise RuntimeError(f"Can't write {format_name.upper()} with this libsndfile: {e}")
+
+    def _write(self, pcm):
+        self._file.buffer_write(pcm, dtype="int16")
+
+    def _close(self):
+        self._file.close()
+
+
+def open_writer(path, sample_rate, target_rate=None, on_first_write=None):
+    """Streaming writer for path, encoding by its extension (.wav, .flac, .opus)"""
+    format_name = format_for_path(path)
+    if format_name == "wav":
+        return StreamingWavWriter(path, sample_rate, target_rate, on_first_write)
+    return SoundFileWriter(path, sample_rate, format_name, target_rate, on_first_write)
+
+
+def audio_duration(path):
+    """Length of an output file in seconds"""
+    if format_for_path(path) == "wav":
+        with wave.open(path, "rb") as wav_file:
+            return wav_file.getnframes() / float(wav_file.getframerate())
+    import soundfile
+    return soundfile.info(path).duration
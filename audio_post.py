@@ -0,0 +1,146 @@
+import math
+import os
+
+FRAME_MS = 10
+
+
+def _dbfs(db):
+    """Linear 16-bit amplitude for a dBFS level"""
+    return 32768.0 * 10 ** (db / 20.0)
+
+
+class PostProcessor:
+    """Streaming clean-up of 16-bit mono PCM segments for one job
+
+    Each segment (a sentence, or its part in one language) is trimmed to its
+    voiced frames plus keep_ms, preceded by a pause that depends on how the
+    previous segment ended, and scaled by a job-wide gain. The gain comes from
+    the running RMS (or peak) of all voiced audio so far, so loudness converges
+    across the job without a second pass, and it is capped per segment so
+    peaks stay below peak_dbfs. Buffers are read in place with np.frombuffer;
+    only running totals are kept between segments.
+    """
+
+    def __init__(self, sample_rate, trim_dbfs=-45.0, keep_ms=40, sentence_pause_ms=250, paragraph_pause_ms=700,
+                 normalize="rms", target_dbfs=-20.0, peak_dbfs=-1.0, max_gain_db=20.0):
+        import numpy as np
+        self._np = np
+        self.sample_rate = sample_rate
+        self.frame = max(1, sample_rate * FRAME_MS // 1000)
+        self.keep = sample_rate * keep_ms // 1000
+        self.threshold = _dbfs(trim_dbfs)
+        self.pauses = {
+            "sentence": sample_rate * sentence_pause_ms // 1000,
+            "paragraph": sample_rate * paragraph_pause_ms // 1000,
+            None: 0,
+        }
+        self.normalize = normalize
+        self.target = _dbfs(target_dbfs)
+        self.peak_limit = _dbfs(peak_dbfs)
+        self.max_gain = 10 ** (max_gain_db / 20.0)
+        self.pending_pause = 0
+        self.trimmed_samples = 0
+        self._sum_squares = 0.0
+        self._voiced_samples = 0
+        self._peak = 0.0
+
+    def _voiced_range(self, samples):
+        """(start, end) of samples around the frames above the energy threshold, or None"""
+        np = self._np
+        count = len(samples) // self.frame
+        if count == 0:
+            peak = np.abs(samples).max() if len(samples) else 0
+            return (0, len(samples)) if peak > self.threshold else None
+        frames = samples[:count * self.frame].reshape(count, self.frame).astype(np.float32)
+        rms = np.sqrt(np.einsum("ij,ij->i", frames, frames) / self.frame)
+        voiced = np.flatnonzero(rms > self.threshold)
+        if len(voiced) == 0:
+            return None
+        start = max(0, voiced[0] * self.frame - self.keep)
+        end = (voiced[-1] + 1) * self.frame
+        # A partial frame at the very end belongs to the last voiced frame
+        if voiced[-1] == count - 1:
+            end = len(samples)
+        return start, min(len(samples), end + self.keep)
+
+    def _gain(self, voiced):
+        """Job-wide gain after folding voiced into the running statistics"""
+        np = self._np
+        samples = voiced.astype(np.float32)
+        self._sum_squares += float(np.dot(samples, samples))
+        self._voiced_samples += len(samples)
+        segment_peak = float(np.abs(samples).max())
+        self._peak = max(self._peak, segment_peak)
+        if self.normalize == "rms":
+            gain = self.target / max(1.0, (self._sum_squares / self._voiced_samples) ** 0.5)
+        elif self.normalize == "peak":
+            gain = self.peak_limit / max(1.0, self._peak)
+        else:
+            return 1.0
+        return min(gain, self.max_gain, self.peak_limit / max(1.0, segment_peak))
+
+    def process(self, pcm, boundary="sentence"):
+        """Processed PCM for one segment; boundary is how it ends: "sentence", "paragraph" or None"""
+        np = self._np
+        samples = np.frombuffer(pcm, dtype="<i2")
+        span = self._voiced_range(samples)
+        if span is None:
+            # All silence: drop it, but keep the strongest pause requested
+            self.trimmed_samples += len(samples)
+            self.pending_pause = max(self.pending_pause, self.pauses[boundary])
+            return b""
+        start, end = span
+        self.trimmed_samples += len(samples) - (end - start)
+        voiced = samples[start:end]
+
+        gain = self._gain(voiced)
+        if gain == 1.0:
+            out = voiced.tobytes()
+        else:
+            scaled = voiced.astype(np.float32)
+            scaled *= gain
+            np.rint(scaled, out=scaled)
+            np.clip(scaled, -32768, 32767, out=scaled)
+            out = scaled.astype("<i2").tobytes()
+
+        # The pause goes in front of the next segment, so the job never ends on silence
+        pause = b"\x00\x00" * self.pending_pause
+        self.pending_pause = self.pauses[boundary]
+        return pause + out
+
+    def stats_text(self):
+        level = (self._sum_squares / self._voiced_samples) ** 0.5 if self._voiced_samples else 0.0
+        return (f"trimmed {self.trimmed_samples / self.sample_rate:.2f}s of silence, "
+                f"voiced RMS {20 * math.log10(max(level, 1.0) / 32768.0):.1f} dBFS, "
+                f"peak {20 * math.log10(max(self._peak, 1.0) / 32768.0):.1f} dBFS before gain")
+
+
+def _env_float(name, default):
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def post_enabled_from_env():
+    """TTS_POST; off by default, so output is unchanged unless asked for"""
+    return os.getenv("TTS_POST", "0").strip().lower() not in ("", "0", "false", "no", "off")
+
+
+def post_processor_from_env(sample_rate, enabled=None):
+    """PostProcessor configured from TTS_POST_* variables, or None when disabled
+
+    enabled overrides TTS_POST.
+    """
+    if enabled is None:
+        enabled = post_enabled_from_env()
+    if not enabled:
+        return None
+    normalize = os.getenv("TTS_POST_NORMALIZE", "rms").strip().lower()
+    return PostProcessor(
+        sample_rate,
+        trim_dbfs=_env_float("TTS_POST_TRIM_DBFS", -45.0),
+        sentence_pause_ms=int(_env_float("TTS_POST_SENTENCE_PAUSE_MS", 250)),
+        paragraph_pause_ms=int(_env_float("TTS_POST_PARAGRAPH_PAUSE_MS", 700)),
+        normalize=None if normalize in ("", "none", "off") else normalize,
+        target_dbfs=_env_float("TTS_POST_TARGET_DBFS", -20.0),
+        peak_dbfs=_env_float("TTS_POST_PEAK_DBFS", -1.0),
+    )
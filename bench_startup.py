@@ -0,0 +1,109 @@
+"""Startup benchmark for tts_app.py: python bench_startup.py [--runs 5] [--max-import-ms 150]"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+# Modules that must not be imported before the window appears
+HEAVY_MODULES = ("piper", "onnxruntime", "grpc", "riva", "requests", "numpy")
+
+
+def import_breakdown():
+    """Run `python -X importtime -c 'import tts_app'` and return [(module, self_us, cumulative_us, depth)]"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import tts_app"],
+        cwd=HERE, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else "import failed")
+    rows = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def time_to_first_window():
+    """Wall-clock ms until tts_app maps its window, or None if there is no display"""
+    if sys.platform.startswith("linux") and not os.environ.get("DISPLAY"):
+        return None, None
+    env = dict(os.environ, TTS_STARTUP_PROBE="1")
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "tts_app.py"], cwd=HERE, env=env, capture_output=True, text=True, timeout=60)
+    wall_ms = (time.perf_counter() - start) * 1000
+    match = re.search(r"first-window-ms ([\d.]+)", result.stdout)
+    if not match:
+        raise RuntimeError(f"startup probe failed: {result.stderr.strip()[-500:]}")
+    return wall_ms, float(match.group(1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure tts_app.py import time and time-to-first-window")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per measurement (median is reported)")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list")
+    parser.add_argument("--max-import-ms", type=float, help="Fail if importing tts_app takes longer")
+    parser.add_argument("--max-window-ms", type=float, help="Fail if time-to-first-window is longer")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    import_totals = []
+    breakdown = []
+    for _ in range(args.runs):
+        breakdown = import_breakdown()
+        total = next(cumulative for module, _, cumulative, depth in reversed(breakdown) if module == "tts_app")
+        import_totals.append(total / 1000)
+    import_ms = statistics.median(import_totals)
+
+    print(f"import tts_app: {import_ms:.1f} ms (median of {args.runs})")
+    print(f"{'module':<40} {'self ms':>9} {'cumul ms':>9}")
+    top_level = sorted((row for row in breakdown if row[3] <= 1), key=lambda row: -row[2])
+    for module, self_us, cumulative_us, _ in top_level[:args.top]:
+        print(f"{module:<40} {self_us / 1000:9.1f} {cumulative_us / 1000:9.1f}")
+
+    heavy = sorted({module for module, *_ in breakdown if module.split(".")[0] in HEAVY_MODULES})
+    if heavy:
+        print(f"Heavy modules on the startup path: {', '.join(heavy)}")
+
+    window_ms = wall_ms = None
+    windows = [time_to_first_window() for _ in range(args.runs)]
+    if windows[0][0] is None:
+        print("time-to-first-window: skipped (no display)")
+    else:
+        wall_ms = statistics.median(w[0] for w in windows)
+        window_ms = statistics.median(w[1] for w in windows)
+        print(f"time-to-first-window: {window_ms:.1f} ms in-process, {wall_ms:.1f} ms including interpreter start")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "import_ms": import_ms,
+                "first_window_ms": window_ms,
+                "first_window_wall_ms": wall_ms,
+                "heavy_modules": heavy,
+                "imports": [{"module": m, "self_us": s, "cumulative_us": c} for m, s, c, _ in top_level],
+            }, f, indent=2)
+
+    failed = False
+    if heavy:
+        print("FAIL: backend modules are imported before the window appears")
+        failed = True
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        print(f"FAIL: import time {import_ms:.1f} ms exceeds {args.max_import_ms} ms")
+        failed = True
+    if args.max_window_ms is not None and window_ms is not None and window_ms > args.max_window_ms:
+        print(f"FAIL: time-to-first-window {window_ms:.1f} ms exceeds {args.max_window_ms} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
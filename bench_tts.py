@@ -0,0 +1,243 @@
+"""Synthesis benchmark for both backends
+
+    python bench_tts.py --model models/en_US-lessac-medium.onnx --json results.json
+    python bench_tts.py --backends api --baseline results.json --threshold 0.10
+
+The API backend runs against an in-process riva_standin server unless
+--api-target is given. Results are JSON so runs can be compared; with
+--baseline, any real-time factor or time-to-first-audio that got worse by more
+than --threshold fails the run.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import shutil
+import socket
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Long documents are built deterministically from the bundled short texts
+LONG_REPEATS = 200
+
+
+def build_corpus(work_dir):
+    """{name: text_file} for the fixed benchmark corpus"""
+    with open(os.path.join(HERE, "test01.txt"), "r", encoding="utf-8") as f:
+        zh = f.read().strip()
+    with open(os.path.join(HERE, "test02.txt"), "r", encoding="utf-8") as f:
+        en = f.read().strip()
+
+    documents = {
+        "short_zh": zh,
+        "short_en": en,
+        "long_en": "\n".join(f"Paragraph {i}. {en}" for i in range(LONG_REPEATS)),
+        "long_zh": "\n".join(f"第{i}段。{zh}" for i in range(LONG_REPEATS)),
+        "long_mixed": "\n".join(f"{en} {zh}" for _ in range(LONG_REPEATS // 2)),
+    }
+    corpus = {}
+    for name, text in documents.items():
+        path = os.path.join(work_dir, f"{name}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        corpus[name] = path
+    return corpus
+
+
+def peak_rss_mb():
+    """High-water resident set size of this process so far, in MB
+
+    It never goes down, and with the in-process stand-in it includes the
+    server, so it is reported once for the whole run rather than per document.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_document(synthesize, text_file, output_wav, repeat):
+    """Median metrics of synthesize(text_file, output_wav, job) over repeat runs"""
+    from audio_output import audio_duration
+    from tts_jobs import Job
+
+    walls, first_audio = [], []
+    for i in range(repeat):
+        job = Job(i, text_file, output_wav, "bench")
+        start = time.perf_counter()
+        synthesize(text_file, output_wav, job)
+        walls.append(time.perf_counter() - start)
+        first_audio.append((job.first_audio_at or time.perf_counter()) - start)
+
+    with open(text_file, "r", encoding="utf-8") as f:
+        chars = len(f.read().strip())
+    wall = statistics.median(walls)
+    audio = audio_duration(output_wav)
+    return {
+        "chars": chars,
+        "audio_seconds": round(audio, 3),
+        "wall_seconds": round(wall, 4),
+        "rtf": round(wall / audio, 4) if audio else None,
+        "time_to_first_audio": round(statistics.median(first_audio), 4),
+        "chars_per_second": round(chars / wall, 1) if wall else None,
+    }
+
+
+def bench_local(model_file, corpus, out_dir, repeat):
+    from onnx_profile import load_voice_with_stats, stats_text
+    from tts_engine import synthesize_local
+
+    # Same execution profile (threads, optimized-model cache, warm-up) the app and server use
+    start = time.perf_counter()
+    voice, load_stats = load_voice_with_stats(model_file)
+    load_seconds = time.perf_counter() - start
+    print(f"local: model {stats_text(load_stats)} ({os.path.basename(model_file)})")
+
+    results = []
+    for name, text_file in corpus.items():
+        output_wav = os.path.join(out_dir, f"local_{name}.wav")
+        metrics = run_document(lambda t, o, job: synthesize_local(voice, t, o, job), text_file, output_wav, repeat)
+        metrics.update(backend="local", document=name, model_load_seconds=round(load_seconds, 4))
+        results.append(metrics)
+        print_result(metrics)
+    return results
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def bench_api(corpus, out_dir, repeat, target, voice, standin_args):
+    from tts_engine import synthesize_api
+
+    server = None
+    if target is None:
+        import riva_standin
+        port = free_port()
+        server = riva_standin.build_server(riva_standin.parse_args(["--port", str(port)] + standin_args))
+        server.start()
+        target = f"127.0.0.1:{port}"
+        os.environ["NVIDIA_USE_SSL"] = "0"
+        print(f"api: using in-process stand-in on {target} ({' '.join(standin_args) or 'defaults'})")
+    os.environ["NVIDIA_SERVER"] = target
+    api_key = os.getenv("NVIDIA_API_KEY", "stand-in")
+
+    results = []
+    try:
+        for name, text_file in corpus.items():
+            output_wav = os.path.join(out_dir, f"api_{name}.wav")
+            metrics = run_document(
+                lambda t, o, job: synthesize_api(t, o, api_key, voice, job), text_file, output_wav, repeat
+            )
+            metrics.update(backend="api", document=name, target=target)
+            results.append(metrics)
+            print_result(metrics)
+    finally:
+        from riva_pool import close_channels
+        close_channels()
+        if server is not None:
+            server.stop(grace=None)
+    return results
+
+
+def print_result(m):
+    print(f"  {m['backend']:<5} {m['document']:<11} {m['chars']:>7} chars  {m['audio_seconds']:8.1f}s audio  "
+          f"RTF {m['rtf']:.3f}  TTFA {m['time_to_first_audio'] * 1000:7.1f} ms  "
+          f"{m['chars_per_second']:9.0f} chars/s")
+
+
+def compare(results, baseline, threshold):
+    """Regressions of rtf/time_to_first_audio beyond threshold versus a baseline run"""
+    previous = {(r["backend"], r["document"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get((result["backend"], result["document"]))
+        if not before:
+            continue
+        for metric in ("rtf", "time_to_first_audio"):
+            old, new = before.get(metric), result.get(metric)
+            if old and new and new > old * (1 + threshold):
+                regressions.append(f"{result['backend']}/{result['document']} {metric}: "
+                                   f"{old:.4f} -> {new:.4f} (+{(new / old - 1):.0%})")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark real-time factor and throughput of both synthesis backends")
+    parser.add_argument("--backends", default="local,api", help="Comma-separated: local, api")
+    parser.add_argument("--model", help="Piper .onnx voice for the local backend (skipped if omitted)")
+    parser.add_argument("--api-target", help="Riva endpoint host:port (default: in-process stand-in)")
+    parser.add_argument("--voice", default="Magpie-Multilingual.EN-US.Aria", help="API voice name")
+    parser.add_argument("--standin-arg", action="append", default=[], help="Extra riva_standin.py argument, repeatable")
+    parser.add_argument("--documents", help="Comma-separated subset of the corpus")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per document (median is reported)")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Earlier --json output to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed relative regression")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Benchmarks measure synthesis, not the segment cache
+    os.environ["TTS_CACHE"] = "0"
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+
+    work_dir = tempfile.mkdtemp(prefix="bench_tts_")
+    try:
+        corpus = build_corpus(work_dir)
+        if args.documents:
+            wanted = args.documents.split(",")
+            corpus = {name: path for name, path in corpus.items() if name in wanted}
+
+        results = []
+        if "local" in backends:
+            if args.model:
+                results += bench_local(args.model, corpus, work_dir, args.repeat)
+            else:
+                print("local: skipped (no --model)")
+        if "api" in backends:
+            results += bench_api(corpus, work_dir, args.repeat, args.api_target, args.voice, args.standin_arg)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"Process peak RSS over the whole run: {peak_rss_mb():.0f} MB"
+          + (" (includes the in-process stand-in)" if "api" in backends and not args.api_target else ""))
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "model": os.path.basename(args.model) if args.model else None,
+            "repeat": args.repeat,
+            "process_peak_rss_mb": round(peak_rss_mb(), 1),
+        },
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Wrote {args.json}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"Regressions beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
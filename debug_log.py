@@ -0,0 +1,59 @@
+import datetime
+import json
+import threading
+from collections import deque
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+
+
+class DebugLog:
+    """Fixed-size ring buffer of debug messages plus a queue of lines not yet shown
+
+    Any thread may add(); the UI drains pending lines in one batch per tick.
+    Timing spans from finished jobs are kept in a second ring for export.
+    """
+
+    def __init__(self, capacity=5000, span_capacity=20000):
+        self.records = deque(maxlen=capacity)  # (level_no, line)
+        self.spans = deque(maxlen=span_capacity)
+        self._pending = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    def add(self, message, level="INFO"):
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        record = (LEVELS.get(level, 20), f"[{timestamp}] {level:<7} {message}\n")
+        with self._lock:
+            self.records.append(record)
+            self._pending.append(record)
+
+    def drain(self, min_level=0):
+        """Lines added since the last drain at or above min_level, joined for one insert"""
+        with self._lock:
+            pending = list(self._pending)
+            self._pending.clear()
+        return "".join(line for level_no, line in pending if level_no >= min_level)
+
+    def text(self, min_level=0):
+        """Every buffered line at or above min_level"""
+        with self._lock:
+            records = list(self.records)
+            self._pending.clear()
+        return "".join(line for level_no, line in records if level_no >= min_level)
+
+    def clear(self):
+        with self._lock:
+            self.records.clear()
+            self._pending.clear()
+
+    def add_spans(self, spans):
+        with self._lock:
+            self.spans.extend(spans)
+
+    def export_spans(self, path):
+        """Write buffered spans as JSON lines; returns the number written"""
+        with self._lock:
+            spans = list(self.spans)
+        with open(path, "w", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span, ensure_ascii=False) + "\n")
+        return len(spans)
@@ -0,0 +1,78 @@
+import re
+
+# CJK Unified Ideographs (+ Extension A and compatibility ideographs)
+_HAN = "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+# Basic Latin and Latin-1/Extended letters
+_LATIN = "A-Za-z\u00c0-\u024f"
+
+_HAN_CHARS = re.compile(f"[{_HAN}]+")
+
+# One match per language run: a run starts at a strong character of its
+# script and extends over anything that isn't a strong character of the other
+# script, up to its last strong character. Matches therefore alternate between
+# zh and en, and the regex engine does the character scanning.
+_RUNS = re.compile(
+    f"(?P<zh>[{_HAN}](?:[^{_LATIN}]*[{_HAN}])?)"
+    f"|(?P<en>[{_LATIN}](?:[^{_HAN}]*[{_LATIN}])?)"
+)
+
+_LANGUAGE_CODES = {"zh": "zh-CN", "en": "en-US"}
+_VOICE_LOCALE = re.compile(r"\.[A-Za-z]{2}-[A-Za-z]{2}\.")
+
+
+def chinese_ratio(text):
+    """Fraction of characters in text that are Han ideographs"""
+    if not text:
+        return 0.0
+    # Deleting whole runs in C avoids building one match object per character
+    return (len(text) - len(_HAN_CHARS.sub("", text))) / len(text)
+
+
+def detect_language(text, threshold=0.2):
+    """Document-wide language code: zh-CN if more than threshold of characters are Chinese"""
+    return "zh-CN" if chinese_ratio(text) > threshold else "en-US"
+
+
+def split_language_runs(text, default="en-US", min_chars=3):
+    """Split text into contiguous [(run_text, language_code)] runs
+
+    Punctuation, digits and spaces between runs stay with the preceding run.
+    English runs shorter than min_chars (e.g. a stray "A" in Chinese text) are
+    folded into a neighbouring run so they aren't sent as separate requests.
+    Chinese runs are kept however short, since one ideograph is already a word.
+    """
+    starts = []
+    for match in _RUNS.finditer(text):
+        starts.append((match.start(), _LANGUAGE_CODES[match.lastgroup]))
+    if not starts:
+        return [(text, default)] if text.strip() else []
+
+    runs = []
+    leading_stray = False
+    for i, (start, language_code) in enumerate(starts):
+        begin = 0 if i == 0 else start
+        end = starts[i + 1][0] if i + 1 < len(starts) else len(text)
+        run_text = text[begin:end]
+        stray = language_code == "en-US" and len(run_text.strip()) < min_chars
+        if runs and (runs[-1][1] == language_code or stray):
+            runs[-1] = (runs[-1][0] + run_text, runs[-1][1])
+        elif leading_stray:
+            # Nothing before the stray run to fold it into: it joins this one
+            runs[-1] = (runs[-1][0] + run_text, language_code)
+        else:
+            runs.append((run_text, language_code))
+        leading_stray = i == 0 and stray
+    return runs
+
+
+def voice_for_language(voice_name, language_code):
+    """Swap the locale in a Magpie voice name, e.g. Magpie-Multilingual.EN-US.Aria -> .ZH-CN.Aria"""
+    return _VOICE_LOCALE.sub(f".{language_code.upper()}.", voice_name, count=1)
+
+
+_WORDS = re.compile(f"[{_HAN}]|[^\\W{_HAN}_]+")
+
+
+def tokenize(text):
+    """Lower-cased words of text with punctuation dropped; each Han ideograph counts as one word"""
+    return _WORDS.findall(text.lower())
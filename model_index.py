@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import tempfile
+
+from audio_cache import model_fingerprint
+
+INDEX_FILE = ".index.json"
+INDEX_VERSION = 1
+# Where the index goes when the models directory is read-only
+FALLBACK_DIR = os.path.join(os.path.expanduser("~"), ".cache", "tts_app")
+
+
+def read_voice_config(config_path):
+    """Voice metadata from a Piper .onnx.json config"""
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    audio = config.get("audio") or {}
+    language = config.get("language") or {}
+    if not isinstance(language, dict):
+        language = {"code": language}
+    sample_rate = audio.get("sample_rate")
+    if not isinstance(sample_rate, int) or sample_rate <= 0:
+        raise ValueError("audio.sample_rate is missing or invalid")
+    return {
+        "sample_rate": sample_rate,
+        "quality": audio.get("quality"),
+        "language": language.get("code") or (config.get("espeak") or {}).get("voice"),
+        "speakers": config.get("num_speakers", 1),
+    }
+
+
+class ModelIndex:
+    """Persistent catalog of the voices in a models directory
+
+    Each entry records the model's file name, size, mtime and content hash plus the
+    metadata from its .onnx.json. refresh() only stats files; configs are
+    re-parsed and models re-hashed when their size or mtime changed. Entries
+    whose config is missing or unreadable carry an "error" so the UI can flag
+    them before a load is attempted. If the models directory can't be written,
+    the index is saved under FALLBACK_DIR instead, or only kept in memory.
+    """
+
+    def __init__(self, models_dir, log=None):
+        self.models_dir = models_dir
+        self.index_path = os.path.join(models_dir, INDEX_FILE)
+        directory_key = hashlib.sha256(os.path.abspath(models_dir).encode("utf-8")).hexdigest()[:16]
+        self.fallback_path = os.path.join(FALLBACK_DIR, f"index-{directory_key}.json")
+        self.log = log or (lambda message: None)
+        self.entries = {}  # file name -> entry dict
+        self._load()
+
+    def _load(self):
+        self.entries = {}
+        for path in (self.index_path, self.fallback_path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if data.get("version") == INDEX_VERSION:
+                self.entries = data.get("entries", {})
+                # Older indexes stored absolute paths, which go stale when the directory moves
+                for entry in self.entries.values():
+                    entry.pop("path", None)
+                return
+
+    def _write(self, path):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"version": INDEX_VERSION, "entries": self.entries}, f, indent=1, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def save(self):
+        """Write the index into the models directory, else FALLBACK_DIR; returns the path or None"""
+        for path in (self.index_path, self.fallback_path):
+            try:
+                self._write(path)
+                return path
+            except OSError as e:
+                error = e
+        self.log(f"Model index kept in memory only, can't be saved: {error}")
+        return None
+
+    def refresh(self):
+        """Bring the index up to date with the directory; returns (added, updated, removed) counts"""
+        seen = set()
+        added = updated = 0
+        for dir_entry in os.scandir(self.models_dir):
+            if not dir_entry.name.endswith(".onnx") or not dir_entry.is_file():
+                continue
+            name = dir_entry.name
+            seen.add(name)
+            stat = dir_entry.stat()
+            config_path = dir_entry.path + ".json"
+            config_mtime = os.path.getmtime(config_path) if os.path.exists(config_path) else None
+
+            entry = self.entries.get(name)
+            if (entry is not None and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime
+                    and entry["config_mtime"] == config_mtime):
+                continue
+
+            new_entry = {
+                "name": name,
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "config_mtime": config_mtime,
+                "error": None,
+                "sample_rate": None,
+                "quality": None,
+                "language": None,
+                "speakers": None,
+            }
+            # Only rehash when the model itself changed, not just its config
+            if entry is not None and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+                new_entry["sha256"] = entry["sha256"]
+            else:
+                new_entry["sha256"] = model_fingerprint(dir_entry.path)
+
+            if config_mtime is None:
+                new_entry["error"] = "missing config"
+            else:
+                try:
+                    new_entry.update(read_voice_config(config_path))
+                except (OSError, ValueError) as e:
+                    new_entry["error"] = f"corrupt config: {e}"
+            if new_entry["error"]:
+                self.log(f"Model {name}: {new_entry['error']}")
+
+            if entry is None:
+                added += 1
+            else:
+                updated += 1
+            self.entries[name] = new_entry
+
+        removed = [name for name in self.entries if name not in seen]
+        for name in removed:
+            del self.entries[name]
+
+        if added or updated or removed:
+            self.save()
+        return added, updated, len(removed)
+
+    def get(self, name):
+        return self.entries.get(name)
+
+    def path(self, entry):
+        """Model file of an entry, under the models directory as it is now"""
+        return os.path.join(self.models_dir, entry["name"])
+
+    def find(self, language=None, sample_rate=None, include_broken=False):
+        """Entries matching a language prefix (e.g. "en" or "zh_CN") and/or sample rate, sorted by name"""
+        results = []
+        for entry in self.entries.values():
+            if entry["error"] and not include_broken:
+                continue
+            if language and not (entry["language"] or "").lower().replace("-", "_").startswith(
+                    language.lower().replace("-", "_")):
+                continue
+            if sample_rate and entry["sample_rate"] != int(sample_rate):
+                continue
+            results.append(entry)
+        return sorted(results, key=lambda entry: entry["name"])
+
+    def languages(self):
+        return sorted({entry["language"] for entry in self.entries.values() if entry["language"]})
+
+    def sample_rates(self):
+        return sorted({entry["sample_rate"] for entry in self.entries.values() if entry["sample_rate"]})
@@ -0,0 +1,210 @@
+"""onnxruntime execution profile and optimized-model cache for Piper voices
+
+    python onnx_profile.py -m models/en_US-lessac-medium.onnx --intra-threads 2
+
+Graph optimization normally runs on every load. With a cache directory, the
+optimized graph is saved once per (model SHA-256, onnxruntime version,
+optimization level) and later loads open it with optimization disabled. At
+level "all" the saved graph can be specific to this CPU, so don't share the
+cache directory between different hosts. An optional warm-up inference after
+load moves first-run allocation out of the first real request. The CLI
+reports load time and first-inference latency with and without the cache.
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import namedtuple
+
+from audio_cache import model_fingerprint
+
+# Names accepted for the optimization level -> onnxruntime GraphOptimizationLevel member
+OPTIMIZATION_LEVELS = {
+    "disable": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL",
+}
+
+WARMUP_TEXT = "Warm up."
+
+# Thread counts of 0 leave the choice to onnxruntime (one per physical core)
+ExecutionProfile = namedtuple(
+    "ExecutionProfile",
+    "intra_threads inter_threads optimization memory_arena cache_dir warmup",
+    defaults=(0, 0, "all", True, None, True),
+)
+
+
+def _env_flag(name, default):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() not in ("0", "false", "no", "off")
+
+
+def profile_from_env(**overrides):
+    """ExecutionProfile from TTS_ORT_* variables; keyword arguments take precedence"""
+    cache_dir = os.getenv("TTS_ORT_CACHE_DIR", os.path.join(os.getcwd(), "cache", "onnx"))
+    profile = ExecutionProfile(
+        intra_threads=int(os.getenv("TTS_ORT_INTRA_THREADS", "0")),
+        inter_threads=int(os.getenv("TTS_ORT_INTER_THREADS", "0")),
+        optimization=os.getenv("TTS_ORT_OPT_LEVEL", "all").strip().lower(),
+        memory_arena=_env_flag("TTS_ORT_MEMORY_ARENA", True),
+        cache_dir=cache_dir if _env_flag("TTS_ORT_CACHE", True) else None,
+        warmup=_env_flag("TTS_ORT_WARMUP", True),
+    )
+    return profile._replace(**overrides)
+
+
+def session_options(ort, profile, optimize=True):
+    """onnxruntime.SessionOptions for profile; optimize=False for graphs that are already optimized"""
+    if profile.optimization not in OPTIMIZATION_LEVELS:
+        raise ValueError(f"Unknown optimization level {profile.optimization!r}; "
+                         f"use one of {', '.join(OPTIMIZATION_LEVELS)}")
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = profile.intra_threads
+    options.inter_op_num_threads = profile.inter_threads
+    options.enable_cpu_mem_arena = profile.memory_arena
+    level = OPTIMIZATION_LEVELS[profile.optimization] if optimize else "ORT_DISABLE_ALL"
+    options.graph_optimization_level = getattr(ort.GraphOptimizationLevel, level)
+    return options
+
+
+def cached_model_path(model_file, profile, ort):
+    """Where the optimized graph of model_file is cached under profile.cache_dir"""
+    name = os.path.splitext(os.path.basename(model_file))[0]
+    key = f"{model_fingerprint(model_file)[:16]}-ort{ort.__version__}-{profile.optimization}"
+    return os.path.join(profile.cache_dir, f"{name}-{key}.onnx")
+
+
+def create_session(model_file, profile, log=None):
+    """(InferenceSession, cache_status) with cache_status "hit", "miss" or "off" """
+    import onnxruntime as ort
+    log = log or (lambda message: None)
+    providers = ["CPUExecutionProvider"]
+    if not profile.cache_dir or profile.optimization == "disable":
+        return ort.InferenceSession(model_file, sess_options=session_options(ort, profile), providers=providers), "off"
+
+    cached = cached_model_path(model_file, profile, ort)
+    if os.path.exists(cached):
+        try:
+            options = session_options(ort, profile, optimize=False)
+            return ort.InferenceSession(cached, sess_options=options, providers=providers), "hit"
+        except Exception as e:
+            log(f"Discarding unreadable optimized model {os.path.basename(cached)}: {e}")
+            os.remove(cached)
+
+    os.makedirs(profile.cache_dir, exist_ok=True)
+    options = session_options(ort, profile)
+    # Write under a temporary name so concurrent loaders never open a partial file
+    fd, partial = tempfile.mkstemp(suffix=".onnx", dir=profile.cache_dir)
+    os.close(fd)
+    options.optimized_model_filepath = partial
+    # onnxruntime warns that "all" can save hardware-specific kernels; the cache is per host
+    options.log_severity_level = 3
+    try:
+        session = ort.InferenceSession(model_file, sess_options=options, providers=providers)
+        os.replace(partial, cached)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return session, "miss"
+
+
+def warm_up(voice):
+    """Run one short synthesis so the first real request doesn't pay for allocation"""
+    for _ in voice.synthesize(WARMUP_TEXT):
+        pass
+
+
+def load_voice_with_stats(model_file, profile=None, log=None):
+    """(PiperVoice, stats) with the load, cache and warm-up timings in stats"""
+    from piper import PiperVoice
+    from piper.config import PiperConfig
+    profile = profile or profile_from_env()
+
+    start = time.perf_counter()
+    with open(f"{model_file}.json", "r", encoding="utf-8") as f:
+        config = PiperConfig.from_dict(json.load(f))
+    session, cache_status = create_session(model_file, profile, log)
+    voice = PiperVoice(session=session, config=config)
+    stats = {"load_seconds": time.perf_counter() - start, "cache": cache_status, "warmup_seconds": None}
+    if profile.warmup:
+        start = time.perf_counter()
+        warm_up(voice)
+        stats["warmup_seconds"] = time.perf_counter() - start
+    return voice, stats
+
+
+def stats_text(stats):
+    text = f"load {stats['load_seconds']:.2f}s (optimized-model cache {stats['cache']})"
+    if stats["warmup_seconds"] is not None:
+        text += f", warm-up {stats['warmup_seconds']:.2f}s"
+    return text
+
+
+def load_voice(model_file, profile=None, log=None):
+    """PiperVoice for model_file with the configured execution profile"""
+    voice, stats = load_voice_with_stats(model_file, profile, log)
+    if log:
+        log(f"Loaded {os.path.basename(model_file)}: {stats_text(stats)}")
+    return voice
+
+
+def threads_per_worker(workers):
+    """Intra-op threads for each of several worker processes so together they don't oversubscribe cores"""
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compare Piper load and first-inference time with and without "
+                                                 "the optimized-model cache")
+    parser.add_argument("-m", "--model", required=True, help="Piper .onnx voice model")
+    parser.add_argument("--intra-threads", type=int, help="Default: TTS_ORT_INTRA_THREADS or onnxruntime's choice")
+    parser.add_argument("--inter-threads", type=int, help="Default: TTS_ORT_INTER_THREADS or onnxruntime's choice")
+    parser.add_argument("--optimization", choices=list(OPTIMIZATION_LEVELS), help="Default: TTS_ORT_OPT_LEVEL or all")
+    parser.add_argument("--text", default="The quick brown fox jumps over the lazy dog.",
+                        help="Sentence timed as the first request")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    overrides = {name: value for name, value in (("intra_threads", args.intra_threads),
+                                                 ("inter_threads", args.inter_threads),
+                                                 ("optimization", args.optimization)) if value is not None}
+
+    def request(voice):
+        start = time.perf_counter()
+        for _ in voice.synthesize(args.text):
+            pass
+        return time.perf_counter() - start
+
+    # Imported up front so the first run isn't charged for it
+    importlib.import_module("onnxruntime")
+    importlib.import_module("piper")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        runs = (
+            ("no cache", dict(cache_dir=None, warmup=False)),
+            ("cache miss", dict(cache_dir=cache_dir, warmup=False)),
+            ("cache hit", dict(cache_dir=cache_dir, warmup=False)),
+            ("hit + warm-up", dict(cache_dir=cache_dir, warmup=True)),
+        )
+        print(f"{'':<14} {'load':>8} {'warm-up':>8} {'1st req':>8} {'2nd req':>8}")
+        for label, run_overrides in runs:
+            profile = profile_from_env(**dict(overrides, **run_overrides))
+            voice, stats = load_voice_with_stats(args.model, profile)
+            first, second = request(voice), request(voice)
+            warmup = f"{stats['warmup_seconds']:.3f}" if stats["warmup_seconds"] is not None else "-"
+            print(f"{label:<14} {stats['load_seconds']:8.3f} {warmup:>8} {first:8.3f} {second:8.3f}")
+    print(f"Threads intra={profile.intra_threads or 'auto'} inter={profile.inter_threads or 'auto'}, "
+          f"optimization {profile.optimization}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
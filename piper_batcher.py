@@ -0,0 +1,237 @@
+"""Micro-batching of concurrent Piper synthesis requests
+
+Requests for the same voice that arrive within max_wait_ms of each other (up
+to max_batch sentences) are padded and run as one ONNX inference, then the
+audio is split back to each caller.
+
+    python piper_batcher.py -m models/en_US-lessac-medium.onnx -c 16 -n 200
+"""
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Audio after the last sample above this fraction of the item's peak is padding
+TRIM_THRESHOLD = 0.01
+# Natural decay kept after the last loud sample when trimming
+TRIM_TAIL_MS = 60
+
+
+class BatcherClosed(RuntimeError):
+    """The batcher was closed before the request could run"""
+
+
+class PiperBatcher:
+    """Coalesces concurrent synthesis for one PiperVoice into batched session.run calls
+
+    The VITS graph takes a padded [batch, max_len] id matrix with per-row
+    lengths, but returns one audio length for the whole batch. Shorter rows come
+    back followed by near-silence, which is trimmed at TRIM_THRESHOLD of the
+    row's peak. Batches of one are returned untrimmed, as Piper would.
+    """
+
+    def __init__(self, voice, max_batch=8, max_wait_ms=10.0, log=None):
+        import numpy as np
+        self._np = np
+        self.voice = voice
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.log = log or (lambda message: None)
+        self.batch_sizes = Counter()
+        self.inference_seconds = 0.0
+        self._queue = queue.Queue()
+        self._closed = False
+        # Held while checking _closed and enqueueing, so nothing lands behind close()'s sentinel
+        self._submit_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="piper-batcher", daemon=True)
+        self._thread.start()
+
+    def submit_ids(self, phoneme_ids, speaker_id=None):
+        """Future resolving to the int16 PCM bytes for one sentence's phoneme ids
+
+        speaker_id only matters for multi-speaker voices; None means the
+        voice's default speaker, as in PiperVoice.synthesize.
+        """
+        future = Future()
+        with self._submit_lock:
+            if self._closed:
+                raise BatcherClosed("batcher is closed")
+            self._queue.put((phoneme_ids, speaker_id, future))
+        return future
+
+    def synthesize(self, text, speaker_id=None):
+        """PCM bytes for text; blocks until every sentence's batch has run"""
+        # piper serializes espeak-ng calls across the process on its own lock
+        sentences = self.voice.phonemize(text)
+        futures = [self.submit_ids(self.voice.phonemes_to_ids(phonemes), speaker_id)
+                   for phonemes in sentences if phonemes]
+        return b"".join(future.result() for future in futures)
+
+    def _collect(self):
+        """Block for the first request, then gather more until the window closes or the batch is full"""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                self._fail_pending()
+                return
+            batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                pcms = self._infer([ids for ids, _, _ in batch], [speaker_id for _, speaker_id, _ in batch])
+            except Exception as e:
+                self.log(f"Batched inference of {len(batch)} sentences failed: {e}")
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, _, future), pcm in zip(batch, pcms):
+                future.set_result(pcm)
+
+    def _fail_pending(self):
+        # Anything still queued once the scheduler stops would otherwise never resolve
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None and item[2].set_running_or_notify_cancel():
+                item[2].set_exception(BatcherClosed("batcher is closed"))
+
+    def _infer(self, id_lists, speaker_ids):
+        np = self._np
+        config = self.voice.config
+        lengths = np.array([len(ids) for ids in id_lists], dtype=np.int64)
+        # 0 is Piper's pad id
+        ids = np.zeros((len(id_lists), lengths.max()), dtype=np.int64)
+        for row, row_ids in enumerate(id_lists):
+            ids[row, :len(row_ids)] = row_ids
+        inputs = {
+            "input": ids,
+            "input_lengths": lengths,
+            "scales": np.array([config.noise_scale, config.length_scale, config.noise_w_scale], dtype=np.float32),
+        }
+        if config.num_speakers > 1:
+            default = getattr(config, "default_speaker_id", 0)
+            inputs["sid"] = np.array([default if speaker_id is None else speaker_id for speaker_id in speaker_ids],
+                                     dtype=np.int64)
+
+        start = time.perf_counter()
+        audio = self.voice.session.run(None, inputs)[0].reshape(len(id_lists), -1)
+        self.inference_seconds += time.perf_counter() - start
+        self.batch_sizes[len(id_lists)] += 1
+
+        tail = int(config.sample_rate * TRIM_TAIL_MS / 1000)
+        pcms = []
+        for row in audio:
+            peak = float(np.abs(row).max())
+            if len(id_lists) > 1 and peak > 1e-8:
+                loud = np.flatnonzero(np.abs(row) > peak * TRIM_THRESHOLD)
+                row = row[:min(len(row), loud[-1] + 1 + tail)]
+            # Same normalization Piper's synthesize() applies
+            if peak > 1e-8:
+                row = row / peak
+            pcms.append((np.clip(row, -1.0, 1.0) * 32767).astype("<i2").tobytes())
+        return pcms
+
+    def stats(self):
+        batches = sum(self.batch_sizes.values())
+        items = sum(size * count for size, count in self.batch_sizes.items())
+        return {
+            "batches": batches,
+            "items": items,
+            "mean_batch": round(items / batches, 2) if batches else 0.0,
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+            "inference_seconds": round(self.inference_seconds, 3),
+        }
+
+    def stats_text(self):
+        stats = self.stats()
+        return (f"batches={stats['batches']} items={stats['items']} mean_batch={stats['mean_batch']} "
+                f"sizes={stats['batch_sizes']} inference={stats['inference_seconds']}s")
+
+    def close(self):
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+
+def run_load(synthesize, texts, concurrency, requests):
+    """Call synthesize from concurrency threads; returns (wall_seconds, audio_bytes)"""
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        audio_bytes = sum(len(pcm) for pcm in executor.map(synthesize, (texts[i % len(texts)] for i in range(requests))))
+        return time.perf_counter() - start, audio_bytes
+
+
+def parse_args(argv=None):
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Compare unbatched and micro-batched Piper throughput")
+    parser.add_argument("-m", "--model", required=True, help="Piper .onnx voice model")
+    parser.add_argument("-c", "--concurrency", type=int, default=16, help="Concurrent callers")
+    parser.add_argument("-n", "--requests", type=int, default=200)
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    parser.add_argument("texts", nargs="*", default=[os.path.join(here, "test02.txt")],
+                        help="Text files supplying one prompt per sentence")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    from piper import PiperVoice
+    from text_stream import iter_sentences
+
+    texts = [sentence for text_file in args.texts for sentence, _ in iter_sentences(text_file)]
+    voice = PiperVoice.load(args.model)
+
+    def unbatched(text):
+        return b"".join(chunk.audio_int16_bytes for chunk in voice.synthesize(text))
+
+    batcher = PiperBatcher(voice, args.max_batch, args.max_wait_ms)
+    # Warm both paths so neither pays first-run allocation costs
+    unbatched(texts[0])
+    batcher.synthesize(texts[0])
+    batcher.batch_sizes.clear()
+    batcher.inference_seconds = 0.0
+
+    sample_rate = voice.config.sample_rate
+    results = {}
+    for name, synthesize in (("unbatched", unbatched), ("batched", batcher.synthesize)):
+        wall, audio_bytes = run_load(synthesize, texts, args.concurrency, args.requests)
+        results[name] = wall
+        print(f"{name:<10} {args.requests / wall:7.1f} req/s  {audio_bytes / 2 / sample_rate / wall:7.1f} "
+              f"audio s/s  wall {wall:.2f}s")
+    batcher.close()
+    print(f"Batches: {batcher.stats_text()}")
+    print(f"Throughput gain: {results['unbatched'] / results['batched']:.2f}x "
+          f"(concurrency {args.concurrency}, max batch {args.max_batch}, max wait {args.max_wait_ms} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""Load generator for the Riva TTS endpoint (real or riva_standin.py)
+
+    python riva_loadgen.py --target localhost:50051 --no-ssl --concurrency 16 --duration 30
+"""
+import argparse
+import itertools
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+import grpc
+
+from riva_pool import ChannelPool, endpoint_from_env
+from text_stream import iter_sentences
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return float("nan")
+    # Rank ceil(fraction * n); rounding first keeps 0.99 * 100 from landing just above 99
+    rank = math.ceil(round(fraction * len(sorted_values), 9))
+    index = min(len(sorted_values) - 1, max(0, rank - 1))
+    return sorted_values[index]
+
+
+def load_sentences(text_files):
+    sentences = []
+    for text_file in text_files:
+        sentences.extend(sentence for sentence, _ in iter_sentences(text_file))
+    if not sentences:
+        raise ValueError("no sentences in the given text files")
+    return sentences
+
+
+def run_load(client, sentences, voice, concurrency, total_requests=None, duration=None):
+    """Drive client.synthesize from concurrency threads; returns (latencies_s, error_counts, wall_s)"""
+    from lang_segment import detect_language, voice_for_language
+
+    latencies = []
+    errors = Counter()
+    lock = threading.Lock()
+    counter = iter(range(total_requests)) if total_requests else itertools.count()
+    deadline = time.monotonic() + duration if duration else None
+
+    def worker():
+        while True:
+            with lock:
+                request_number = next(counter, None)
+            if request_number is None or (deadline and time.monotonic() >= deadline):
+                return
+            text = sentences[request_number % len(sentences)]
+            language_code = detect_language(text)
+            start = time.perf_counter()
+            try:
+                client.synthesize(text, voice_for_language(voice, language_code), language_code)
+            except grpc.RpcError as e:
+                with lock:
+                    errors[e.code().name] += 1
+                continue
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sorted(latencies), errors, time.perf_counter() - start
+
+
+def parse_args(argv=None):
+    server_url, function_id, use_ssl = endpoint_from_env()
+    parser = argparse.ArgumentParser(description="Drive Synthesize calls at a target concurrency and report latency")
+    parser.add_argument("--target", default=server_url, help="gRPC server (default: NVIDIA_SERVER or the NVIDIA cloud)")
+    parser.add_argument("--function-id", default=function_id)
+    parser.add_argument("--no-ssl", action="store_true", default=not use_ssl, help="Plaintext channel (local stand-in)")
+    parser.add_argument("--api-key", default=os.getenv("NVIDIA_API_KEY", "stand-in"))
+    parser.add_argument("--voice", default="Magpie-Multilingual.EN-US.Aria")
+    parser.add_argument("-c", "--concurrency", type=int, default=8)
+    parser.add_argument("-n", "--requests", type=int, help="Total requests (default: run for --duration)")
+    parser.add_argument("-d", "--duration", type=float, default=10.0, help="Seconds to run when --requests is not set")
+    parser.add_argument("--deadline", type=float, default=30.0, help="Per-request deadline in seconds")
+    parser.add_argument("--retries", type=int, default=0, help="Client retries on UNAVAILABLE/RESOURCE_EXHAUSTED")
+    parser.add_argument("--hedge-ms", type=float, help="Send a hedged duplicate after this many ms")
+    parser.add_argument("texts", nargs="*", default=[os.path.join(HERE, "test01.txt"), os.path.join(HERE, "test02.txt")],
+                        help="Text files supplying request sentences")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sentences = load_sentences(args.texts)
+    pool = ChannelPool()
+    client = pool.tts_client(
+        args.target, args.function_id, args.api_key, use_ssl=not args.no_ssl,
+        deadline=args.deadline, max_retries=args.retries,
+        hedge_delay=args.hedge_ms / 1000.0 if args.hedge_ms else None,
+    )
+    print(f"Target {args.target} ({'plaintext' if args.no_ssl else 'TLS'}), concurrency {args.concurrency}, "
+          + (f"{args.requests} requests" if args.requests else f"{args.duration:.0f}s"))
+
+    latencies, errors, wall = run_load(
+        client, sentences, args.voice, args.concurrency,
+        total_requests=args.requests, duration=None if args.requests else args.duration,
+    )
+    pool.close()
+
+    completed = len(latencies)
+    failed = sum(errors.values())
+    print(f"Completed: {completed} ok, {failed} failed in {wall:.2f}s")
+    print(f"Throughput: {completed / wall:.1f} req/s")
+    if latencies:
+        print("Latency ms: p50 {:.1f}  p95 {:.1f}  p99 {:.1f}  max {:.1f}".format(
+            *(percentile(latencies, p) * 1000 for p in (0.50, 0.95, 0.99)), latencies[-1] * 1000))
+    for code, count in errors.most_common():
+        print(f"  {code}: {count}")
+    return 1 if failed and not completed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
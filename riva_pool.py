@@ -0,0 +1,241 @@
+import os
+import queue
+import random
+import threading
+import time
+
+import grpc
+
+import riva_protos
+
+riva_tts_pb2, riva_tts_pb2_grpc = riva_protos.tts()
+riva_audio_pb2 = riva_protos.audio()
+
+# NVIDIA Magpie TTS gRPC endpoint; NVIDIA_SERVER / NVIDIA_TTS_FUNCTION_ID override it
+# (the same variables server.js reads) and NVIDIA_USE_SSL=0 allows a plaintext local server.
+DEFAULT_SERVER_URL = "grpc.nvcf.nvidia.com:443"
+DEFAULT_TTS_FUNCTION_ID = "877104f7-e885-42b9-8de8-f6e4c6303969"
+
+CHANNEL_OPTIONS = [
+    ("grpc.keepalive_time_ms", 30000),
+    ("grpc.keepalive_timeout_ms", 10000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+    ("grpc.max_receive_message_length", 64 * 1024 * 1024),
+]
+
+RETRYABLE_CODES = (grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.RESOURCE_EXHAUSTED)
+
+
+def env_flag(name, default):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() not in ("0", "false", "no", "off")
+
+
+def auth_metadata(function_id, api_key):
+    """Per-call metadata routing a request to an NVCF function"""
+    return [("function-id", function_id), ("authorization", f"Bearer {api_key}")]
+
+
+def endpoint_from_env():
+    """(server_url, function_id, use_ssl) for the TTS API"""
+    return (
+        os.getenv("NVIDIA_SERVER", DEFAULT_SERVER_URL),
+        os.getenv("NVIDIA_TTS_FUNCTION_ID", DEFAULT_TTS_FUNCTION_ID),
+        env_flag("NVIDIA_USE_SSL", True),
+    )
+
+
+class TTSClient:
+    """Synthesize calls over a shared channel with deadlines, retries and optional hedging"""
+
+    def __init__(self, channel, metadata, deadline=30.0, max_retries=3, backoff=0.5, hedge_delay=None):
+        self.stub = riva_tts_pb2_grpc.RivaSpeechSynthesisStub(channel)
+        self.metadata = metadata
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.hedge_delay = hedge_delay
+
+    def synthesize(self, text, voice_name, language_code, sample_rate_hz=22050, log=None, before_attempt=None):
+        """Return the LINEAR_PCM audio bytes for text
+
+        before_attempt, if given, is called before the first try and every
+        retry, e.g. to take a rate-limiter token or check for cancellation.
+        """
+        request = riva_tts_pb2.SynthesizeSpeechRequest(
+            text=text,
+            voice_name=voice_name,
+            language_code=language_code,
+            encoding=riva_audio_pb2.LINEAR_PCM,
+            sample_rate_hz=sample_rate_hz,
+        )
+        attempt = 0
+        while True:
+            if before_attempt is not None:
+                before_attempt()
+            try:
+                if self.hedge_delay is None:
+                    response = self.stub.Synthesize(request, timeout=self.deadline, metadata=self.metadata)
+                else:
+                    response = self._hedged(request)
+                return response.audio
+            except grpc.RpcError as e:
+                if e.code() not in RETRYABLE_CODES or attempt >= self.max_retries:
+                    raise
+                # Exponential backoff with full jitter
+                delay = random.uniform(0, self.backoff * (2 ** attempt))
+                attempt += 1
+                if log:
+                    log(f"{e.code().name}, retrying in {delay:.2f}s (attempt {attempt}/{self.max_retries})")
+                time.sleep(delay)
+
+    def _hedged(self, request):
+        """Send request; if no answer within hedge_delay send a second copy and take the first success"""
+        done = queue.Queue()
+        futures = []
+
+        def launch():
+            future = self.stub.Synthesize.future(request, timeout=self.deadline, metadata=self.metadata)
+            future.add_done_callback(done.put)
+            futures.append(future)
+
+        launch()
+        try:
+            finished = done.get(timeout=self.hedge_delay)
+        except queue.Empty:
+            launch()
+            finished = done.get()
+
+        error = None
+        remaining = len(futures)
+        while True:
+            remaining -= 1
+            if finished.exception() is None:
+                for other in futures:
+                    if other is not finished:
+                        other.cancel()
+                return finished.result()
+            error = error or finished.exception()
+            if remaining == 0:
+                raise error
+            finished = done.get()
+
+
+class RateLimiter:
+    """Token bucket shared by worker threads; rate is requests per second (None = unlimited)"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class ChannelPool:
+    """Long-lived gRPC channels keyed by server URL, and TTS clients keyed by endpoint, API key and options
+
+    Clients are cheap wrappers around the shared channel, so changed options
+    (deadline, retries, hedging) get a new client on the same connection.
+    """
+
+    def __init__(self):
+        self._clients = {}
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def _channel(self, server_url, use_ssl):
+        channel = self._channels.get((server_url, use_ssl))
+        if channel is None:
+            if use_ssl:
+                channel = grpc.secure_channel(server_url, grpc.ssl_channel_credentials(), options=CHANNEL_OPTIONS)
+            else:
+                channel = grpc.insecure_channel(server_url, options=CHANNEL_OPTIONS)
+            self._channels[(server_url, use_ssl)] = channel
+        return channel
+
+    def channel(self, server_url, use_ssl=True):
+        """Shared channel to server_url; services pick their function with per-call metadata"""
+        with self._lock:
+            return self._channel(server_url, use_ssl)
+
+    def tts_client(self, server_url, function_id, api_key, use_ssl=True, **client_options):
+        key = (server_url, use_ssl, function_id, api_key, tuple(sorted(client_options.items())))
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = TTSClient(self._channel(server_url, use_ssl), auth_metadata(function_id, api_key),
+                                   **client_options)
+                self._clients[key] = client
+            return client
+
+    def close(self):
+        with self._lock:
+            for channel in self._channels.values():
+                channel.close()
+            self._channels.clear()
+            self._clients.clear()
+
+
+_pool = ChannelPool()
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_tts_client(api_key):
+    """Shared TTS client for the configured endpoint; tuning comes from the environment
+
+    TTS_API_DEADLINE (seconds), TTS_API_RETRIES and TTS_API_HEDGE_MS (unset = no hedging)
+    are read on every call, so changes apply to the next job.
+    """
+    server_url, function_id, use_ssl = endpoint_from_env()
+    hedge_ms = os.getenv("TTS_API_HEDGE_MS")
+    return _pool.tts_client(
+        server_url, function_id, api_key, use_ssl=use_ssl,
+        deadline=float(os.getenv("TTS_API_DEADLINE", "30")),
+        max_retries=int(os.getenv("TTS_API_RETRIES", "3")),
+        hedge_delay=float(hedge_ms) / 1000.0 if hedge_ms else None,
+    )
+
+
+def get_rate_limiter(burst=1):
+    """Process-wide rate limiter for the configured endpoint, shared by every job that calls it
+
+    TTS_API_RATE_LIMIT is requests per second for this process (unset = unlimited);
+    a changed limit gets a new limiter with the next job.
+    """
+    server_url, function_id, _ = endpoint_from_env()
+    rate_limit = os.getenv("TTS_API_RATE_LIMIT")
+    key = (server_url, function_id, float(rate_limit) if rate_limit else None, burst)
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(key)
+        if limiter is None:
+            limiter = _rate_limiters[key] = RateLimiter(key[2], burst=burst)
+        return limiter
+
+
+def get_channel(server_url, use_ssl=True):
+    """The process-wide channel to server_url"""
+    return _pool.channel(server_url, use_ssl)
+
+
+def close_channels():
+    """Close every pooled channel, e.g. before the server behind them goes away"""
+    _pool.close()
@@ -0,0 +1,58 @@
+import functools
+import importlib
+import importlib.util
+import os
+import sys
+
+PROTO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "proto")
+
+
+def _has_module(name):
+    try:
+        return importlib.util.find_spec(name) is not None
+    except ImportError:
+        return False
+
+
+def available():
+    """True if gRPC and a source of Riva message classes are installed, without importing them"""
+    return _has_module("grpc") and (_has_module("grpc_tools") or _has_module("riva.client"))
+
+
+@functools.lru_cache(maxsize=None)
+def _load(name):
+    """(pb2, pb2_grpc) for proto/riva_<name>.proto
+
+    Compiled at runtime from this repo's proto/ directory when grpcio-tools is
+    installed, otherwise taken from nvidia-riva-client. Both describe the same
+    nvidia.riva.* messages, so a process must stick to one source.
+    """
+    import grpc
+    if _has_module("grpc_tools"):
+        if PROTO_DIR not in sys.path:
+            sys.path.append(PROTO_DIR)
+        return grpc.protos_and_services(f"riva_{name}.proto")
+    pb2 = importlib.import_module(f"riva.client.proto.riva_{name}_pb2")
+    pb2_grpc = importlib.import_module(f"riva.client.proto.riva_{name}_pb2_grpc")
+    return pb2, pb2_grpc
+
+
+def tts():
+    """(riva_tts_pb2, riva_tts_pb2_grpc)"""
+    return _load("tts")
+
+
+def asr():
+    """(riva_asr_pb2, riva_asr_pb2_grpc)"""
+    return _load("asr")
+
+
+@functools.lru_cache(maxsize=None)
+def audio():
+    """riva_audio_pb2 (AudioEncoding)"""
+    import grpc
+    if _has_module("grpc_tools"):
+        if PROTO_DIR not in sys.path:
+            sys.path.append(PROTO_DIR)
+        return grpc.protos("riva_audio.proto")
+    return importlib.import_module("riva.client.proto.riva_audio_pb2")
@@ -0,0 +1,206 @@
+"""Local stand-in for the Riva TTS/ASR gRPC services defined in proto/
+
+    python riva_standin.py --port 50051 --latency-ms 80 --jitter-ms 20 --error-rate 0.01
+    NVIDIA_SERVER=localhost:50051 NVIDIA_USE_SSL=0 python tts_app.py
+"""
+import argparse
+import math
+import os
+import random
+import struct
+import sys
+import threading
+import time
+from concurrent import futures
+
+import grpc
+
+import riva_protos
+
+riva_tts_pb2, riva_tts_pb2_grpc = riva_protos.tts()
+riva_asr_pb2, riva_asr_pb2_grpc = riva_protos.asr()
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def synthetic_pcm(text, sample_rate, ms_per_char):
+    """16-bit mono tone whose length follows the text length, like real speech would"""
+    seconds = max(0.2, len(text) * ms_per_char / 1000.0)
+    count = int(seconds * sample_rate)
+    # One period of a quiet 220 Hz tone, repeated; cheap enough for load tests
+    period = max(1, sample_rate // 220)
+    cycle = struct.pack(f"<{period}h", *(int(3000 * math.sin(2 * math.pi * i / period)) for i in range(period)))
+    repeats, remainder = divmod(count, period)
+    return cycle * repeats + cycle[:remainder * 2]
+
+
+class Faults:
+    """Latency, jitter, error injection and a requests/s cap shared by both services"""
+
+    def __init__(self, latency_ms=50.0, jitter_ms=0.0, error_rate=0.0, max_rps=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.max_rps = max_rps
+        self._tokens = float(max_rps or 0)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take_token(self):
+        if not self.max_rps:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.max_rps, self._tokens + (now - self._updated) * self.max_rps)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def apply(self, context, extra_ms=0.0):
+        """Sleep for the configured latency, or abort the call with an injected error"""
+        if not self._take_token():
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "stand-in rate limit exceeded")
+        if self.error_rate and random.random() < self.error_rate:
+            context.abort(grpc.StatusCode.UNAVAILABLE, "stand-in injected failure")
+        delay = self.latency_ms + extra_ms + (random.gauss(0, self.jitter_ms) if self.jitter_ms else 0.0)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+
+class SpeechSynthesis(riva_tts_pb2_grpc.RivaSpeechSynthesisServicer):
+    def __init__(self, faults, ms_per_char, render_ms_per_char):
+        self.faults = faults
+        self.ms_per_char = ms_per_char
+        self.render_ms_per_char = render_ms_per_char
+
+    def Synthesize(self, request, context):
+        self.faults.apply(context, extra_ms=len(request.text) * self.render_ms_per_char)
+        sample_rate = request.sample_rate_hz or 22050
+        return riva_tts_pb2.SynthesizeSpeechResponse(
+            audio=synthetic_pcm(request.text, sample_rate, self.ms_per_char)
+        )
+
+
+class SpeechRecognition(riva_asr_pb2_grpc.RivaSpeechRecognitionServicer):
+    """Returns canned transcripts: zh* language codes get the Chinese one, others the English one"""
+
+    def __init__(self, faults, transcripts, interim_bytes):
+        self.faults = faults
+        self.transcripts = transcripts
+        self.interim_bytes = interim_bytes
+
+    def _transcript(self, config):
+        language = (config.language_code or "en-US").lower()
+        return self.transcripts["zh" if language.startswith("zh") else "en"]
+
+    @staticmethod
+    def _result(transcript, is_final, audio_bytes):
+        return riva_asr_pb2.SpeechRecognitionResult(
+            alternatives=[riva_asr_pb2.SpeechRecognitionAlternative(transcript=transcript, confidence=0.9)],
+            is_final=is_final,
+            stability=1.0 if is_final else 0.5,
+            audio_processed=audio_bytes,
+        )
+
+    def Recognize(self, request, context):
+        self.faults.apply(context)
+        transcript = self._transcript(request.config)
+        return riva_asr_pb2.RecognizeResponse(results=[self._result(transcript, True, len(request.audio))])
+
+    def StreamingRecognize(self, request_iterator, context):
+        config = None
+        interim = False
+        received = 0
+        next_interim = self.interim_bytes
+        transcript = ""
+        shown = 0
+        for request in request_iterator:
+            if request.HasField("streaming_config"):
+                config = request.streaming_config.config
+                interim = request.streaming_config.interim_results
+                transcript = self._transcript(config)
+                self.faults.apply(context)
+                continue
+            received += len(request.audio_content)
+            if interim and received >= next_interim:
+                next_interim += self.interim_bytes
+                # Reveal the transcript a token at a time as audio arrives
+                tokens = transcript.split()
+                joiner = " "
+                if len(tokens) <= 1:
+                    tokens, joiner = list(transcript), ""
+                shown = min(shown + 1, len(tokens))
+                result = self._result(joiner.join(tokens[:shown]), False, received)
+                yield riva_asr_pb2.StreamingRecognizeResponse(results=[result])
+        if config is None:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, "first request must carry streaming_config")
+        self.faults.apply(context)
+        result = self._result(transcript, True, received)
+        yield riva_asr_pb2.StreamingRecognizeResponse(results=[result])
+
+    def GetConfig(self, request, context):
+        return riva_asr_pb2.GetConfigResponse(config=riva_asr_pb2.RecognitionConfig(
+            encoding=riva_asr_pb2.RecognitionConfig.LINEAR_PCM, sample_rate_hertz=16000, language_code="en-US",
+        ))
+
+
+def read_transcript(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return " ".join(f.read().split())
+
+
+def build_server(args):
+    faults = Faults(args.latency_ms, args.jitter_ms, args.error_rate, args.max_rps)
+    server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=args.workers),
+        # Calls beyond this are rejected with RESOURCE_EXHAUSTED, like an overloaded endpoint
+        maximum_concurrent_rpcs=args.max_concurrent,
+    )
+    riva_tts_pb2_grpc.add_RivaSpeechSynthesisServicer_to_server(
+        SpeechSynthesis(faults, args.audio_ms_per_char, args.render_ms_per_char), server
+    )
+    transcripts = {"zh": read_transcript(args.zh_transcript), "en": read_transcript(args.en_transcript)}
+    riva_asr_pb2_grpc.add_RivaSpeechRecognitionServicer_to_server(
+        SpeechRecognition(faults, transcripts, args.interim_bytes), server
+    )
+    server.add_insecure_port(f"{args.host}:{args.port}")
+    return server
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Stand-in Riva TTS/ASR gRPC server for local load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=50051)
+    parser.add_argument("--workers", type=int, default=32, help="Server thread pool size")
+    parser.add_argument("--max-concurrent", type=int, help="Reject calls beyond this many in flight")
+    parser.add_argument("--max-rps", type=float, help="Reject calls beyond this many per second")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Base latency per call")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Gaussian latency jitter (std dev)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls failed with UNAVAILABLE")
+    parser.add_argument("--render-ms-per-char", type=float, default=1.0, help="Extra TTS latency per input character")
+    parser.add_argument("--audio-ms-per-char", type=float, default=60.0, help="Synthetic audio length per character")
+    parser.add_argument("--interim-bytes", type=int, default=32000, help="Audio bytes between interim ASR results")
+    parser.add_argument("--zh-transcript", default=os.path.join(HERE, "test01.txt"))
+    parser.add_argument("--en-transcript", default=os.path.join(HERE, "test02.txt"))
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    server = build_server(args)
+    server.start()
+    print(f"Riva stand-in listening on {args.host}:{args.port} "
+          f"(latency {args.latency_ms}±{args.jitter_ms} ms, error rate {args.error_rate}, "
+          f"max rps {args.max_rps or '-'}, max concurrent {args.max_concurrent or '-'})")
+    print(f"Point the app at it with NVIDIA_SERVER={args.host}:{args.port} NVIDIA_USE_SSL=0")
+    try:
+        server.wait_for_termination()
+    except KeyboardInterrupt:
+        server.stop(grace=1)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+import codecs
+import os
+import re
+
+# Sentence boundaries for Chinese and English text: CJK terminators, western
+# terminators followed by whitespace, and blank lines. A single line break is
+# just wrapping. Closing quotes/brackets stay with the sentence they end.
+_SENTENCE_END = re.compile(
+    r'(?:[。！？；…]+|[.!?;]+(?=\s))[”’"\'）)\]」』]*|\n\s*\n'
+)
+
+# A line break inside a sentence, with the whitespace around it
+_WRAP = re.compile(r'\s*\n\s*')
+_CJK = re.compile(r'[\u3000-\u9fff\uff00-\uffef]')
+
+# Places a sentence that is too long may be broken, best first
+_SOFT_BREAKS = (re.compile(r'[，,、：:]'), re.compile(r'\s'))
+
+DEFAULT_MAX_CHARS = 400
+DEFAULT_BLOCK_SIZE = 64 * 1024
+
+
+def _unwrap(match):
+    # Wrapped CJK text joins without a space; anything else gets one
+    text = match.string
+    before = text[match.start() - 1] if match.start() > 0 else ""
+    after = text[match.end()] if match.end() < len(text) else ""
+    return "" if _CJK.match(before) and _CJK.match(after) else " "
+
+
+def split_long(sentence, max_chars):
+    """Split a sentence longer than max_chars at commas, then spaces, then anywhere
+
+    Line breaks inside the sentence are joined first.
+    """
+    sentence = _WRAP.sub(_unwrap, sentence)
+    pieces = []
+    while len(sentence) > max_chars:
+        cut = -1
+        for pattern in _SOFT_BREAKS:
+            for match in pattern.finditer(sentence, 0, max_chars):
+                cut = match.end()
+            if cut > 0:
+                break
+        if cut <= 0:
+            cut = max_chars
+        pieces.append(sentence[:cut])
+        sentence = sentence[cut:]
+    pieces.append(sentence)
+    return [piece for piece in pieces if piece.strip()]
+
+
+def split_sentences(text, max_chars=DEFAULT_MAX_CHARS):
+    """Split an in-memory string into sentences"""
+    sentences = []
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        sentences.extend(split_long(text[start:match.end()].strip(), max_chars))
+        start = match.end()
+    sentences.extend(split_long(text[start:].strip(), max_chars))
+    return [s for s in sentences if s]
+
+
+def _iter_pieces(text_file, max_chars, block_size):
+    """(sentence or None, fraction_of_file_read, paragraph_break) as the file is read
+
+    paragraph_break is True when a blank line ends the sentence; a blank line
+    after a sentence that already ended comes through as (None, fraction, True).
+    """
+    total_bytes = os.path.getsize(text_file) or 1
+    read_bytes = 0
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+
+    with open(text_file, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            read_bytes += len(block)
+            pending += decoder.decode(block, final=not block)
+            fraction = read_bytes / total_bytes
+
+            if not block:
+                for sentence in split_long(pending.strip(), max_chars):
+                    yield sentence, 1.0, False
+                return
+
+            start = 0
+            for match in _SENTENCE_END.finditer(pending):
+                # A terminator at the very end of the buffer may continue in the next block
+                if match.end() == len(pending):
+                    break
+                pieces = split_long(pending[start:match.end()].strip(), max_chars)
+                paragraph_break = "\n" in match.group()
+                for sentence in pieces[:-1]:
+                    yield sentence, fraction, False
+                yield (pieces[-1] if pieces else None), fraction, paragraph_break
+                start = match.end()
+            pending = pending[start:]
+
+            # No boundary within a whole block: flush it so the buffer stays bounded
+            if len(pending) > max(block_size, max_chars):
+                pieces = split_long(pending, max_chars)
+                pending = pieces.pop() if pieces else ""
+                for sentence in pieces:
+                    if sentence.strip():
+                        yield sentence.strip(), fraction, False
+
+
+def iter_paragraph_sentences(text_file, max_chars=DEFAULT_MAX_CHARS, block_size=DEFAULT_BLOCK_SIZE):
+    """Like iter_sentences, but yield (sentence, fraction_of_file_read, paragraph_end)
+
+    Paragraphs are separated by blank lines, so paragraph_end is True for the
+    last sentence before a blank line and for the last of the file. Each sentence is held back until
+    the next one is found, to know what follows it.
+    """
+    held = None
+    for sentence, fraction, paragraph_break in _iter_pieces(text_file, max_chars, block_size):
+        if sentence is None:
+            if held is not None and paragraph_break:
+                yield held + (True,)
+                held = None
+            continue
+        if held is not None:
+            yield held + (False,)
+        held = (sentence, fraction)
+        if paragraph_break:
+            yield held + (True,)
+            held = None
+    if held is not None:
+        yield held + (True,)
+
+
+def iter_sentences(text_file, max_chars=DEFAULT_MAX_CHARS, block_size=DEFAULT_BLOCK_SIZE):
+    """Read text_file incrementally and yield (sentence, fraction_of_file_read)
+
+    Only one block plus one unfinished sentence is held in memory at a time,
+    so memory stays flat regardless of file size.
+    """
+    for sentence, fraction, _ in iter_paragraph_sentences(text_file, max_chars, block_size):
+        yield sentence, fraction
@@ -1,31 +1,39 @@
+import time
+
+STARTUP_T0 = time.perf_counter()
+
+import importlib
 import os
+import threading
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import tkinter.ttk as ttk
-import wave
-import sys
-import requests
-import json
-import grpc
-from dotenv import load_dotenv
-from piper import PiperVoice
-
-# Load environment variables
-load_dotenv()
-
-# Try to import NVIDIA Riva client
-try:
-    from riva.client.tts import SpeechSynthesisService, AudioEncoding
-    from riva.client.auth import Auth
-    RIVA_AVAILABLE = True
-except ImportError:
-    RIVA_AVAILABLE = False
+from voice_cache import VoiceCache
+from debug_log import DebugLog, LEVELS
+from model_index import ModelIndex
+from tts_jobs import JobQueue
+from audio_output import FORMATS
+from audio_post import post_enabled_from_env
+from onnx_profile import load_voice
+from tts_engine import output_path_for, synthesize_local, synthesize_api
+import riva_protos
+
+# Heavy backend modules (piper/onnxruntime, grpc/riva) are imported on first use
+# or warmed in the background once the window is up; see TTSApp.warm_backend.
+BACKEND_MODULES = {
+    "local": "piper",
+    "api": "riva_pool",
+}
+
 
 class TTSApp:
+    JOB_POLL_MS = 100
+    DEBUG_FLUSH_MS = 100
+
     def __init__(self, root):
         self.root = root
         self.root.title("Piper TTS Generator")
-        self.root.geometry("600x600")  # Larger initial size to fit debug console
+        self.root.geometry("600x760")  # Larger initial size to fit job list and debug console
 
         # Variables
         self.model_path = tk.StringVar()
@@ -35,14 +43,42 @@ class TTSApp:
         self.tts_mode = tk.StringVar(value="local")  # local or api
         self.api_voice = tk.StringVar(value="Magpie-Multilingual.EN-US.Aria")
         self.debug_text = None
-        self.debug_buffer = []  # Buffer for debug messages
+        self.debug_log = DebugLog(capacity=int(os.getenv("TTS_DEBUG_LINES", "5000")))
+        self.debug_level = tk.StringVar(value="INFO")
+        self.preload_voice = tk.BooleanVar(value=True)
+        self.model_index = None
+        self.indexing = False
+        self.language_filter = tk.StringVar(value="All")
+        self.sample_rate_filter = tk.StringVar(value="All")
+        self.output_format = tk.StringVar(value=os.getenv("TTS_OUTPUT_FORMAT", "wav"))
+        self.output_rate = tk.StringVar(value="Voice")
+        self.post_process = tk.BooleanVar(value=post_enabled_from_env())
+
+        # Loaded voices are reused across generations; limits come from .env
+        max_voices = os.getenv("TTS_VOICE_CACHE_MAX", "2")
+        max_mb = os.getenv("TTS_VOICE_CACHE_MB")
+        self.voice_cache = VoiceCache(
+            max_voices=int(max_voices) if max_voices else None,
+            max_bytes=int(float(max_mb) * 1e6) if max_mb else None,
+            loader=lambda model_file: load_voice(model_file, log=self.debug_print),
+            log=self.debug_print,
+        )
+
+        # Synthesis runs on worker threads; results come back via poll_jobs
+        self.job_queue = JobQueue(max_workers=int(os.getenv("TTS_JOB_WORKERS", "2")))
 
         # Initialize UI
         self.create_menu()
         self.create_widgets()
         
-        # Load models on startup
-        self.load_models()
+        # Load models and warm the backend once the window has been drawn
+        self.warmed_backends = set()
+        self.root.after_idle(self.load_models)
+        self.root.after_idle(self.warm_backend)
+
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.after(self.JOB_POLL_MS, self.poll_jobs)
+        self.root.after(self.DEBUG_FLUSH_MS, self.flush_debug)
 
     def create_menu(self):
         menubar = tk.Menu(self.root)
@@ -76,8 +112,8 @@ class TTSApp:
         mode_frame.columnconfigure(1, weight=1)
         
         # Radio buttons for mode selection
-        tk.Radiobutton(mode_frame, text="Local Model", variable=self.tts_mode, value="local", command=self.update_ui_based_on_mode).grid(row=0, column=1, sticky="w", padx=5)
-        tk.Radiobutton(mode_frame, text="NVIDIA Magpie API", variable=self.tts_mode, value="api", command=self.update_ui_based_on_mode).grid(row=0, column=2, sticky="w", padx=5)
+        tk.Radiobutton(mode_frame, text="Local Model", variable=self.tts_mode, value="local", command=self.on_mode_changed).grid(row=0, column=1, sticky="w", padx=5)
+        tk.Radiobutton(mode_frame, text="NVIDIA Magpie API", variable=self.tts_mode, value="api", command=self.on_mode_changed).grid(row=0, column=2, sticky="w", padx=5)
 
         # Model Selection (Local)
         self.model_frame = tk.LabelFrame(main_frame, text="Local Model Configuration", padx=10, pady=10)
@@ -87,8 +123,21 @@ class TTSApp:
         
         self.model_combobox = ttk.Combobox(self.model_frame, textvariable=self.model_path, width=50, state="readonly")
         self.model_combobox.grid(row=0, column=1, padx=5, sticky="ew")
+        self.model_combobox.bind("<<ComboboxSelected>>", self.on_model_selected)
         
         tk.Button(self.model_frame, text="Refresh", command=self.load_models).grid(row=0, column=2, padx=5)
+        tk.Checkbutton(self.model_frame, text="Preload voice on select", variable=self.preload_voice).grid(row=1, column=1, sticky="w", padx=5)
+
+        filter_frame = tk.Frame(self.model_frame)
+        filter_frame.grid(row=2, column=0, columnspan=3, sticky="w", pady=(5, 0))
+        tk.Label(filter_frame, text="Language:").pack(side="left")
+        self.language_filter_combobox = ttk.Combobox(filter_frame, textvariable=self.language_filter, values=["All"], width=10, state="readonly")
+        self.language_filter_combobox.pack(side="left", padx=5)
+        self.language_filter_combobox.bind("<<ComboboxSelected>>", self.apply_model_filter)
+        tk.Label(filter_frame, text="Sample Rate:").pack(side="left", padx=(10, 0))
+        self.sample_rate_filter_combobox = ttk.Combobox(filter_frame, textvariable=self.sample_rate_filter, values=["All"], width=8, state="readonly")
+        self.sample_rate_filter_combobox.pack(side="left", padx=5)
+        self.sample_rate_filter_combobox.bind("<<ComboboxSelected>>", self.apply_model_filter)
 
         # API Configuration
         self.api_frame = tk.LabelFrame(main_frame, text="NVIDIA Magpie API Configuration", padx=10, pady=10)
@@ -121,9 +170,31 @@ class TTSApp:
         tk.Entry(file_frame, textvariable=self.text_file_path, width=40).grid(row=0, column=1, padx=5, sticky="ew")
         tk.Button(file_frame, text="Browse...", command=self.select_text_file).grid(row=0, column=2, padx=5)
 
+        output_frame = tk.Frame(file_frame)
+        output_frame.grid(row=1, column=0, columnspan=3, sticky="w", pady=(5, 0))
+        tk.Label(output_frame, text="Output Format:").pack(side="left")
+        ttk.Combobox(output_frame, textvariable=self.output_format, values=list(FORMATS), width=6, state="readonly").pack(side="left", padx=5)
+        tk.Label(output_frame, text="Sample Rate:").pack(side="left", padx=(10, 0))
+        ttk.Combobox(output_frame, textvariable=self.output_rate, values=["Voice", "16000", "22050", "24000", "44100", "48000"], width=8, state="readonly").pack(side="left", padx=5)
+        tk.Checkbutton(output_frame, text="Trim, pause and level", variable=self.post_process).pack(side="left", padx=(10, 0))
+
         # Generate Button
         tk.Button(main_frame, text="Generate Audio", command=self.generate_audio, bg="#4CAF50", fg="black", font=("Arial", 12, "bold"), height=2).pack(fill="x", pady=10)
 
+        # Job Queue
+        job_frame = tk.LabelFrame(main_frame, text="Jobs", padx=10, pady=10)
+        job_frame.pack(fill="x", pady=(0, 10))
+
+        self.job_tree = ttk.Treeview(job_frame, columns=("file", "mode", "status", "progress"), show="headings", height=4)
+        for column, heading, width in (("file", "Text File", 240), ("mode", "Mode", 60), ("status", "Status", 80), ("progress", "Progress", 70)):
+            self.job_tree.heading(column, text=heading)
+            self.job_tree.column(column, width=width, stretch=(column == "file"))
+        self.job_tree.grid(row=0, column=0, columnspan=2, sticky="ew")
+
+        tk.Button(job_frame, text="Queue Files...", command=self.queue_text_files).grid(row=1, column=0, sticky="w", pady=(5, 0))
+        tk.Button(job_frame, text="Cancel", command=self.cancel_jobs).grid(row=1, column=1, sticky="e", pady=(5, 0))
+        job_frame.columnconfigure(0, weight=1)
+
         # Debug Area (inside main_frame, below Generate Audio button)
         self.debug_frame = tk.LabelFrame(main_frame, text="Debug Console", padx=10, pady=10)
         # Initially visible
@@ -138,9 +209,16 @@ class TTSApp:
         scrollbar.pack(side="right", fill="y")
         self.debug_text.config(yscrollcommand=scrollbar.set)
         
-        # Add clear button
-        clear_button = tk.Button(self.debug_frame, text="Clear", command=self.clear_debug)
-        clear_button.pack(side="bottom", padx=10, pady=5)
+        # Add level filter, export and clear buttons
+        debug_controls = tk.Frame(self.debug_frame)
+        debug_controls.pack(side="bottom", fill="x", pady=(5, 0))
+        tk.Label(debug_controls, text="Level:").pack(side="left")
+        level_combobox = ttk.Combobox(debug_controls, textvariable=self.debug_level, values=list(LEVELS), width=8, state="readonly")
+        level_combobox.pack(side="left", padx=5)
+        level_combobox.bind("<<ComboboxSelected>>", self.redraw_debug)
+        tk.Button(debug_controls, text="Export Spans...", command=self.export_spans).pack(side="left", padx=5)
+        clear_button = tk.Button(debug_controls, text="Clear", command=self.clear_debug)
+        clear_button.pack(side="right", padx=10)
 
         # Status Bar
         status_bar = tk.Label(self.root, textvariable=self.status_var, relief="sunken", anchor="w", padx=5)
@@ -161,6 +239,29 @@ class TTSApp:
             self.model_frame.pack_forget()
             self.api_frame.pack(fill="x", pady=(0, 10))
 
+    def on_mode_changed(self):
+        self.update_ui_based_on_mode()
+        self.warm_backend()
+
+    def warm_backend(self):
+        """Import the current mode's backend modules in a background thread"""
+        mode = self.tts_mode.get()
+        if mode in self.warmed_backends:
+            return
+        self.warmed_backends.add(mode)
+        if mode == "api" and not riva_protos.available():
+            return
+
+        def run():
+            start = time.perf_counter()
+            try:
+                importlib.import_module(BACKEND_MODULES[mode])
+                self.debug_print(f"Warmed {mode} backend in {(time.perf_counter() - start) * 1000:.0f} ms", "DEBUG")
+            except Exception as e:
+                self.debug_print(f"Could not warm {mode} backend: {e}", "WARNING")
+
+        threading.Thread(target=run, name=f"warm-{mode}", daemon=True).start()
+
     def open_debug_window(self):
         """Toggle debug console visibility in main window"""
         if self.debug_frame.winfo_ismapped():
@@ -171,74 +272,162 @@ class TTSApp:
             # Show debug console
             self.debug_frame.pack(fill="both", expand=True, pady=(10, 0))
             self.debug_print("Debug console opened.")
-            
-            # Display buffered messages
-            if self.debug_buffer:
-                # Clear existing content first
-                self.debug_text.delete(1.0, tk.END)
-                self.debug_print(f"Displaying {len(self.debug_buffer)} buffered messages...")
-                for msg in self.debug_buffer:
-                    self.debug_text.insert(tk.END, msg)
-                self.debug_text.see(tk.END)
-
-    def debug_print(self, message):
-        """Print message to debug console"""
-        import datetime
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        debug_message = f"[{timestamp}] {message}\n"
-        
-        # Add to buffer
-        self.debug_buffer.append(debug_message)
-        
-        # If debug console is visible, print to it
+            self.redraw_debug()
+
+    def debug_print(self, message, level="INFO"):
+        """Print message to debug console; safe to call from any thread
+
+        Messages go into a bounded ring buffer and reach the widget in one
+        batched insert per flush_debug tick.
+        """
+        self.debug_log.add(message, level)
+
+    def min_debug_level(self):
+        return LEVELS.get(self.debug_level.get(), 0)
+
+    def flush_debug(self):
+        """Insert pending debug lines in one batch; reschedules itself on the Tk loop"""
         if self.debug_text and self.debug_frame.winfo_ismapped():
-            self.debug_text.insert(tk.END, debug_message)
-            self.debug_text.see(tk.END)  # Auto-scroll to end
+            text = self.debug_log.drain(self.min_debug_level())
+            if text:
+                self.debug_text.insert(tk.END, text)
+                # Keep the widget as bounded as the buffer behind it
+                excess = int(self.debug_text.index("end-1c").split(".")[0]) - self.debug_log.records.maxlen
+                if excess > 0:
+                    self.debug_text.delete("1.0", f"{excess + 1}.0")
+                self.debug_text.see(tk.END)  # Auto-scroll to end
+        self.root.after(self.DEBUG_FLUSH_MS, self.flush_debug)
+
+    def redraw_debug(self, event=None):
+        """Replace the widget content with the buffered messages at the current level"""
+        self.debug_text.delete(1.0, tk.END)
+        self.debug_text.insert(tk.END, self.debug_log.text(self.min_debug_level()))
+        self.debug_text.see(tk.END)
 
     def clear_debug(self):
         """Clear debug console content"""
         if self.debug_text:
+            self.debug_log.clear()
             self.debug_text.delete(1.0, tk.END)
             self.debug_print("Debug console cleared.")
 
+    def export_spans(self):
+        """Save timing spans of finished jobs as JSON lines"""
+        filename = filedialog.asksaveasfilename(
+            title="Export Timing Spans",
+            defaultextension=".jsonl",
+            filetypes=[("JSON Lines", "*.jsonl"), ("All Files", "*.*")]
+        )
+        if filename:
+            count = self.debug_log.export_spans(filename)
+            self.debug_print(f"Exported {count} timing spans to: {filename}")
+
     def load_models(self):
+        """Bring the model index up to date on a worker thread, then repopulate the voice list"""
+        if self.indexing:
+            return
         models_dir = os.path.join(os.getcwd(), "models")
         self.debug_print(f"Loading models from directory: {models_dir}")
         
         if not os.path.exists(models_dir):
             self.debug_print(f"Creating models directory: {models_dir}")
             os.makedirs(models_dir)
-        
-        self.available_models = []
-        try:
-            files = os.listdir(models_dir)
-            self.debug_print(f"Found files in models directory: {files}")
-            
-            for f in files:
-                if f.endswith(".onnx"):
-                    full_path = os.path.join(models_dir, f)
-                    self.available_models.append(full_path)
-                    self.debug_print(f"Added model: {f}")
-        except Exception as e:
-            self.debug_print(f"Error loading models: {e}")
-            messagebox.showerror("Error", f"Failed to load models: {e}")
-
-        if self.available_models:
-            # Update combobox values to show filenames only, but store full path in logic if needed
-            # Actually, let's just show filenames in the box
-            display_names = [os.path.basename(m) for m in self.available_models]
-            self.model_combobox['values'] = display_names
-            if display_names:
+
+        self.indexing = True
+        self.status_var.set("Indexing voice models...")
+
+        def run():
+            # The first pass hashes every model; a fresh index keeps the UI's copy consistent meanwhile
+            try:
+                index = ModelIndex(models_dir, log=lambda message: self.debug_print(message, "WARNING"))
+                counts = index.refresh()
+                self.root.after(0, self.on_models_indexed, index, counts, None)
+            except Exception as e:
+                self.root.after(0, self.on_models_indexed, None, None, e)
+
+        threading.Thread(target=run, name="model-index", daemon=True).start()
+
+    def on_models_indexed(self, index, counts, error):
+        self.indexing = False
+        if error is not None:
+            self.debug_print(f"Error loading models: {error}", "ERROR")
+            messagebox.showerror("Error", f"Failed to load models: {error}")
+            return
+        self.model_index = index
+        added, updated, removed = counts
+        self.debug_print(f"Model index: {len(index.entries)} voices ({added} added, {updated} updated, {removed} removed)")
+
+        self.language_filter_combobox['values'] = ["All"] + self.model_index.languages()
+        self.sample_rate_filter_combobox['values'] = ["All"] + [str(rate) for rate in self.model_index.sample_rates()]
+        self.apply_model_filter()
+
+        if not self.model_index.entries:
+            self.status_var.set("No models found in ./models directory.")
+            self.debug_print("No models found in ./models directory.")
+            messagebox.showinfo("No Models", "No voice models found in the 'models' folder.\nPlease download a .onnx model and its .json config.")
+
+    def apply_model_filter(self, event=None):
+        """Show indexed voices matching the language and sample rate filters"""
+        if self.model_index is None:
+            return
+        language = self.language_filter.get()
+        sample_rate = self.sample_rate_filter.get()
+        entries = self.model_index.find(
+            language=None if language == "All" else language,
+            sample_rate=None if sample_rate == "All" else sample_rate,
+            include_broken=True,
+        )
+        self.available_models = [self.model_index.path(entry) for entry in entries]
+        display_names = [entry["name"] for entry in entries]
+        self.model_combobox['values'] = display_names
+
+        if display_names:
+            if self.model_path.get() not in display_names:
                 self.model_combobox.current(0) # Select first one
                 self.model_path.set(display_names[0])
                 self.debug_print(f"Selected default model: {display_names[0]}")
-            self.status_var.set(f"Loaded {len(self.available_models)} models.")
-            self.debug_print(f"Loaded {len(self.available_models)} models successfully.")
+                self.on_model_selected()
+            broken = sum(1 for entry in entries if entry["error"])
+            self.status_var.set(f"Loaded {len(entries)} models" + (f" ({broken} with config problems)." if broken else "."))
+            self.debug_print(f"Showing {len(entries)} models.")
         else:
+            self.model_combobox.set("")
             self.model_combobox['values'] = []
-            self.status_var.set("No models found in ./models directory.")
-            self.debug_print("No models found in ./models directory.")
-            messagebox.showinfo("No Models", "No voice models found in the 'models' folder.\nPlease download a .onnx model and its .json config.")
+            self.status_var.set("No models match the filters.")
+
+    def model_error(self, selected_model_name):
+        """Config problem recorded in the index for a voice, or None"""
+        entry = self.model_index.get(selected_model_name) if self.model_index else None
+        return entry["error"] if entry else None
+
+    def resolve_model_file(self, selected_model_name):
+        """Map a combobox entry to a model path, or None if it doesn't exist"""
+        models_dir = os.path.join(os.getcwd(), "models")
+        model_file = os.path.join(models_dir, selected_model_name)
+        self.debug_print(f"Using local model: {model_file}")
+
+        if not os.path.exists(model_file):
+            # Fallback if user manually entered a path or something weird happened
+            if os.path.exists(selected_model_name):
+                model_file = selected_model_name
+                self.debug_print(f"Using fallback model path: {model_file}")
+            else:
+                self.debug_print(f"Model file not found: {model_file}")
+                return None
+        return model_file
+
+    def on_model_selected(self, event=None):
+        """Warm the voice cache with the newly selected model"""
+        error = self.model_error(self.model_path.get())
+        if error:
+            self.debug_print(f"Voice {self.model_path.get()} can't be loaded: {error}", "WARNING")
+            return
+        if not self.preload_voice.get():
+            return
+        model_file = self.resolve_model_file(self.model_path.get())
+        if model_file:
+            self.debug_print(f"Preloading voice: {os.path.basename(model_file)}")
+            self.voice_cache.preload(model_file)
 
     def select_text_file(self):
         filename = filedialog.askopenfilename(
@@ -256,22 +445,24 @@ class TTSApp:
             messagebox.showerror("Error", "Please select a valid text file.")
             return
 
+        self.queue_text_file(text_file)
+
+    def queue_text_files(self):
+        """Pick several text files and queue them all with the current settings"""
+        filenames = filedialog.askopenfilenames(
+            title="Select Text Files",
+            filetypes=[("Text Files", "*.txt"), ("All Files", "*.*")]
+        )
+        for filename in filenames:
+            if not self.queue_text_file(filename):
+                break
+
+    def queue_text_file(self, text_file):
+        """Queue one text file for synthesis; returns False if settings are invalid"""
         # Determine output filename
-        base_name = os.path.splitext(text_file)[0]
-        output_wav = f"{base_name}.wav"
+        output_wav = output_path_for(text_file, audio_format=self.output_format.get())
         self.debug_print(f"Output file will be saved to: {output_wav}")
 
-        # Read text from file
-        try:
-            with open(text_file, 'r', encoding='utf-8') as f:
-                text = f.read()
-            self.debug_print(f"Read text from file: {text_file}")
-            self.debug_print(f"Text content (first 100 chars): {text[:100]}...")
-        except Exception as e:
-            self.debug_print(f"Error reading text file: {str(e)}")
-            messagebox.showerror("Error", f"Failed to read text file: {str(e)}")
-            return
-
         # Get selected mode
         mode = self.tts_mode.get()
         self.debug_print(f"Selected TTS mode: {mode}")
@@ -279,74 +470,68 @@ class TTSApp:
         if mode == "local":
             # Local model processing
             self.debug_print("Starting local model processing...")
-            self.generate_audio_local(output_wav, text)
+            job = self.generate_audio_local(text_file, output_wav)
         else:
             # API processing
             self.debug_print("Starting NVIDIA Magpie API processing...")
-            self.generate_audio_api(output_wav, text)
+            job = self.generate_audio_api(text_file, output_wav)
 
-    def generate_audio_local(self, output_wav, text):
-        """Generate audio using local model"""
+        if job is None:
+            return False
+        self.job_tree.insert("", "end", iid=str(job.job_id), values=(job.name, job.mode, job.status, "0%"))
+        self.status_var.set(f"Queued {job.name} ({len(self.job_queue.active_jobs())} active)")
+        return True
+
+    def selected_output_rate(self):
+        """Output sample rate chosen in the UI, or None to keep the voice's own rate"""
+        rate = self.output_rate.get()
+        return None if rate == "Voice" else int(rate)
+
+    def generate_audio_local(self, text_file, output_wav):
+        """Queue a job that generates audio using the local model"""
         selected_model_name = self.model_path.get()
         if not selected_model_name:
              messagebox.showerror("Error", "Please select a voice model.")
-             return
-
-        # Find full path
-        models_dir = os.path.join(os.getcwd(), "models")
-        model_file = os.path.join(models_dir, selected_model_name)
-        self.debug_print(f"Using local model: {model_file}")
-
-        if not os.path.exists(model_file):
-            # Fallback if user manually entered a path or something weird happened
-            if os.path.exists(selected_model_name):
-                model_file = selected_model_name
-                self.debug_print(f"Using fallback model path: {model_file}")
-            else:
-                self.debug_print(f"Model file not found: {model_file}")
-                messagebox.showerror("Error", f"Model file not found: {model_file}")
-                return
-
-        self.status_var.set("Loading model...")
-        self.root.update()
-        self.debug_print("Loading model...")
-
-        try:
-            voice = PiperVoice.load(model_file)
-            self.debug_print("Model loaded successfully")
-            
-            self.status_var.set("Synthesizing audio...")
-            self.root.update()
-            self.debug_print("Synthesizing audio...")
-
-            # Synthesize
-            with wave.open(output_wav, "wb") as wav_file:
-                voice.synthesize_wav(text, wav_file)
-            self.debug_print(f"Audio synthesized successfully and saved to: {output_wav}")
-
-            self.status_var.set(f"Done! Saved to {os.path.basename(output_wav)}")
-            messagebox.showinfo("Success", f"Audio generated successfully:\n{output_wav}")
-
-        except Exception as e:
-            self.status_var.set("Error occurred")
-            self.debug_print(f"Error during local audio generation: {str(e)}")
-            messagebox.showerror("Error", str(e))
-            print(e)
-
-    def generate_audio_api(self, output_wav, text):
-        """Generate audio using NVIDIA Magpie TTS API via gRPC"""
+             return None
+
+        error = self.model_error(selected_model_name)
+        if error:
+            messagebox.showerror("Error", f"Voice {selected_model_name} can't be loaded: {error}")
+            return None
+
+        model_file = self.resolve_model_file(selected_model_name)
+        if model_file is None:
+            messagebox.showerror("Error", f"Model file not found: {selected_model_name}")
+            return None
+
+        output_rate = self.selected_output_rate()
+        post = self.post_process.get()
+
+        def run(job):
+            job.log("Loading model...")
+            with job.span("model_load"):
+                voice = self.voice_cache.get(model_file)
+            job.log("Model loaded successfully")
+            job.log("Synthesizing audio...")
+            synthesize_local(voice, text_file, output_wav, job, model_file=model_file, output_rate=output_rate, post=post)
+            job.log(f"Audio synthesized successfully and saved to: {output_wav}")
+
+        return self.job_queue.submit(text_file, output_wav, "local", run)
+
+    def generate_audio_api(self, text_file, output_wav):
+        """Queue a job that generates audio using NVIDIA Magpie TTS API via gRPC"""
         # Check if Riva client is available
-        if not RIVA_AVAILABLE:
-            self.debug_print("NVIDIA Riva client not available. Please install: pip install nvidia-riva-client")
-            messagebox.showerror("Error", "NVIDIA Riva client not available. Please install: pip install nvidia-riva-client")
-            return
+        if not riva_protos.available():
+            self.debug_print("NVIDIA Riva client not available. Please install: pip install grpcio nvidia-riva-client")
+            messagebox.showerror("Error", "NVIDIA Riva client not available. Please install: pip install grpcio nvidia-riva-client")
+            return None
 
         # Get API key from environment variable
         api_key = os.getenv("NVIDIA_API_KEY")
         if not api_key:
             self.debug_print("NVIDIA_API_KEY not found in .env file")
             messagebox.showerror("Error", "NVIDIA_API_KEY not found in .env file")
-            return
+            return None
         else:
             self.debug_print("NVIDIA_API_KEY found in .env file")
 
@@ -354,93 +539,83 @@ class TTSApp:
         if not selected_voice:
             self.debug_print("No voice selected for API")
             messagebox.showerror("Error", "Please select a voice for API.")
-            return
+            return None
         else:
             self.debug_print(f"Selected API voice: {selected_voice}")
 
-        self.status_var.set("Synthesizing audio via API...")
-        self.root.update()
-        self.debug_print("Synthesizing audio via NVIDIA Magpie API...")
-
-        try:
-            # NVIDIA Magpie TTS gRPC endpoint
-            server_url = "grpc.nvcf.nvidia.com:443"
-            function_id = "877104f7-e885-42b9-8de8-f6e4c6303969"
-            self.debug_print(f"Connecting to gRPC server: {server_url}")
-            self.debug_print(f"Function ID: {function_id}")
-
-            # Create Auth object with metadata for NVIDIA NIM
-            auth = Auth(
-                use_ssl=True,
-                uri=server_url,
-                metadata_args=[
-                    ["function-id", function_id],
-                    ["authorization", f"Bearer {api_key}"]
-                ]
-            )
-            self.debug_print("Auth object created with metadata")
-
-            # Create Riva TTS service
-            tts_service = SpeechSynthesisService(auth)
-            self.debug_print("Riva TTS service created")
-
-            # Parse voice name to get language code
-            # Auto-detect language from text content
-            def is_chinese(text):
-                chinese_chars = 0
-                for char in text:
-                    if ord(char) >= 0x4e00 and ord(char) <= 0x9fff:
-                        chinese_chars += 1
-                return chinese_chars > len(text) * 0.2  # If more than 20% Chinese characters
-            
-            if is_chinese(text):
-                language_code = "zh-CN"
-                self.debug_print(f"Detected Chinese language from text")
-            else:
-                language_code = "en-US"
-                self.debug_print(f"Detected English language from text")
-            
-            self.debug_print(f"Language code: {language_code}")
-
-            # Synthesize speech
-            self.debug_print("Sending synthesis request...")
-            response = tts_service.synthesize(
-                text=text,
-                voice_name=selected_voice,
-                language_code=language_code,
-                encoding=AudioEncoding.LINEAR_PCM,
-                sample_rate_hz=22050
-            )
-            self.debug_print("Synthesis request completed")
-
-            # Save the audio response
-            self.debug_print(f"Saving audio response to: {output_wav}")
-            with wave.open(output_wav, "wb") as wav_file:
-                wav_file.setnchannels(1)
-                wav_file.setsampwidth(2)
-                wav_file.setframerate(22050)
-                wav_file.writeframes(response.audio)
-            
-            self.debug_print(f"Audio saved successfully: {output_wav}")
-
-            self.status_var.set(f"Done! Saved to {os.path.basename(output_wav)}")
-            messagebox.showinfo("Success", f"Audio generated successfully via NVIDIA Magpie API:\n{output_wav}")
-
-        except Exception as e:
-            self.status_var.set("Error occurred")
-            self.debug_print(f"Error during API audio generation: {str(e)}")
-            messagebox.showerror("Error", str(e))
-            print(e)
-        finally:
-            # Clean up if needed
-            try:
-                if 'auth' in locals():
-                    # Auth object will be garbage collected automatically
-                    self.debug_print("Auth cleanup complete")
-            except:
-                pass
+        output_rate = self.selected_output_rate()
+        post = self.post_process.get()
+
+        def run(job):
+            job.log("Synthesizing audio via NVIDIA Magpie API...")
+            synthesize_api(text_file, output_wav, api_key, selected_voice, job, output_rate=output_rate, post=post)
+
+        return self.job_queue.submit(text_file, output_wav, "api", run)
+
+    def cancel_jobs(self):
+        """Cancel the selected jobs, or every active job if none is selected"""
+        selected = self.job_tree.selection()
+        if selected:
+            jobs = [job for job in self.job_queue.jobs if str(job.job_id) in selected]
+        else:
+            jobs = self.job_queue.active_jobs()
+        for job in jobs:
+            if job.status in ("queued", "running"):
+                job.cancel()
+                self.debug_print(f"Cancelling job {job.job_id}: {job.name}")
+
+    def poll_jobs(self):
+        """Apply worker events to the UI; reschedules itself on the Tk loop"""
+        for kind, job, payload in self.job_queue.poll():
+            if kind == "log":
+                level, message = payload
+                self.debug_print(message, level)
+                continue
+            if kind == "spans":
+                self.debug_log.add_spans(payload)
+                continue
+
+            iid = str(job.job_id)
+            if self.job_tree.exists(iid):
+                self.job_tree.item(iid, values=(job.name, job.mode, job.status, f"{job.progress:.0%}"))
+
+            if kind != "status":
+                continue
+            if job.status == "running":
+                self.status_var.set(f"Synthesizing {job.name}...")
+            elif job.status == "done":
+                self.status_var.set(f"Done! Saved to {os.path.basename(job.output_wav)}")
+            elif job.status == "cancelled":
+                self.status_var.set(f"Cancelled {job.name}")
+            elif job.status == "failed":
+                self.status_var.set("Error occurred")
+                messagebox.showerror("Error", f"{job.name}: {job.error}")
+
+        self.root.after(self.JOB_POLL_MS, self.poll_jobs)
+
+    def on_close(self):
+        self.job_queue.shutdown()
+        self.root.destroy()
+
+def report_first_window(root):
+    """Print time-to-first-window for bench_startup.py and exit before any deferred startup work"""
+    root.update_idletasks()
+    print(f"first-window-ms {(time.perf_counter() - STARTUP_T0) * 1000:.1f}", flush=True)
+    os._exit(0)
+
+
+def main():
+    # Load environment variables
+    from dotenv import load_dotenv
+    load_dotenv()
 
-if __name__ == "__main__":
     root = tk.Tk()
+    if os.getenv("TTS_STARTUP_PROBE"):
+        # Registered first so it runs before the app's own after_idle work
+        root.after_idle(report_first_window, root)
     app = TTSApp(root)
     root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""Headless batch renderer: python tts_batch.py INPUT -o OUTPUT_DIR --model voice.onnx"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from dotenv import load_dotenv
+
+from audio_cache import model_fingerprint
+from audio_output import FORMATS
+from audio_post import post_enabled_from_env
+from tts_engine import output_path_for, synthesize_api, synthesize_local
+from tts_jobs import Job
+from model_index import ModelIndex
+from onnx_profile import load_voice, profile_from_env, threads_per_worker
+
+# Per-process state, set once by _init_worker
+_worker = {}
+
+
+def _init_worker(mode, model_file, api_key, api_voice, verbose, output_rate=None, post=None, threads=None,
+                 rate_limit=None):
+    if rate_limit:
+        # TTS_API_RATE_LIMIT applies per process; this worker's share of the batch limit
+        os.environ["TTS_API_RATE_LIMIT"] = str(rate_limit)
+    _worker.update(mode=mode, model_file=model_file, api_key=api_key, api_voice=api_voice, verbose=verbose,
+                   output_rate=output_rate, post=post)
+    if mode == "local":
+        start = time.perf_counter()
+        _worker["voice"] = load_voice(model_file, profile_from_env(intra_threads=threads),
+                                      log=print if verbose else None)
+        # Load and warm-up are charged to the first job this worker renders
+        _worker["model_load"] = time.perf_counter() - start
+
+
+def _render(index, text_file, output_wav):
+    """Render one file inside a worker; returns (text_file, writer_stats, elapsed, error, spans)"""
+    log = print if _worker["verbose"] else None
+    job = Job(index, text_file, output_wav, _worker["mode"], log=log)
+    if "model_load" in _worker:
+        job.add_timing("model_load", _worker.pop("model_load"))
+    start = time.perf_counter()
+    try:
+        with job.span("total"):
+            if _worker["mode"] == "local":
+                stats = synthesize_local(_worker["voice"], text_file, output_wav, job,
+                                         model_file=_worker["model_file"], output_rate=_worker["output_rate"],
+                                         post=_worker["post"])
+            else:
+                stats = synthesize_api(text_file, output_wav, _worker["api_key"], _worker["api_voice"], job,
+                                       output_rate=_worker["output_rate"], post=_worker["post"])
+        job.status = "done"
+        result = (text_file, stats, time.perf_counter() - start, None)
+    except Exception as e:
+        job.remove_partial_output()
+        job.status = "failed"
+        result = (text_file, None, time.perf_counter() - start, str(e))
+    if _worker["verbose"]:
+        job.log(f"Timing: {job.timing_summary()}")
+    return result + (job.span_records(),)
+
+
+def collect_inputs(pattern):
+    """Text files from a directory (*.txt) or a glob pattern, sorted"""
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "*.txt")
+    return sorted(f for f in glob.glob(pattern, recursive=True) if os.path.isfile(f))
+
+
+def input_root(pattern):
+    """Directory an input directory or glob pattern starts from, e.g. texts for 'texts/**/*.txt'"""
+    if os.path.isdir(pattern):
+        return pattern
+    root = os.path.dirname(pattern)
+    while any(char in root for char in "*?["):
+        root = os.path.dirname(root)
+    return root or os.curdir
+
+
+def render_settings(args, model_file=None):
+    """Everything besides the text that an output depends on"""
+    return {
+        "mode": args.mode,
+        "model_sha256": model_fingerprint(model_file) if model_file else None,
+        "voice": args.voice if args.mode == "api" else None,
+        "output_rate": args.output_rate,
+        "post": post_enabled_from_env() if args.post is None else args.post,
+    }
+
+
+def settings_path(output_wav):
+    return f"{output_wav}.settings.json"
+
+
+def save_settings(output_wav, settings):
+    with open(settings_path(output_wav), "w", encoding="utf-8") as f:
+        json.dump(settings, f)
+
+
+def is_up_to_date(text_file, output_wav, settings):
+    """True if output_wav is newer than its text file and was rendered with the same settings"""
+    if not os.path.exists(output_wav) or os.path.getmtime(text_file) > os.path.getmtime(output_wav):
+        return False
+    try:
+        with open(settings_path(output_wav), "r", encoding="utf-8") as f:
+            return json.load(f) == settings
+    except (OSError, ValueError):
+        return False
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Render a directory of text files to audio without the UI")
+    parser.add_argument("input", nargs="?", help="Input directory (all *.txt) or glob pattern, e.g. 'texts/**/*.txt'")
+    parser.add_argument("-o", "--output-dir", help="Output directory (default: next to each text file)")
+    parser.add_argument("--mode", choices=["local", "api"], default="local", help="Synthesis backend")
+    parser.add_argument("--format", choices=list(FORMATS), default=os.getenv("TTS_OUTPUT_FORMAT", "wav"),
+                        help="Output encoding (flac/opus need soundfile)")
+    parser.add_argument("--output-rate", type=int, help="Resample output to this rate (default: the voice's rate)")
+    parser.add_argument("--post", action=argparse.BooleanOptionalAction, default=None,
+                        help="Trim silences, insert pauses and level loudness (default: TTS_POST)")
+    parser.add_argument("-m", "--model", help="Piper .onnx voice model path, or a voice name from the models directory (local mode)")
+    parser.add_argument("--models-dir", default=os.path.join(os.getcwd(), "models"), help="Voice library to index")
+    parser.add_argument("--list-models", action="store_true", help="List indexed voices and exit")
+    parser.add_argument("--language", help="With --list-models: only voices whose language starts with this, e.g. en or zh_CN")
+    parser.add_argument("--sample-rate", type=int, help="With --list-models: only voices with this sample rate")
+    parser.add_argument("--voice", default="Magpie-Multilingual.EN-US.Aria", help="Magpie voice name (api mode)")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--threads", type=int, default=int(os.getenv("TTS_ORT_INTRA_THREADS", "0")) or None,
+                        help="ONNX threads per worker (default: TTS_ORT_INTRA_THREADS, else cores / workers)")
+    parser.add_argument("--force", action="store_true", help="Re-render outputs that are already up to date")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print per-job debug messages and timings")
+    parser.add_argument("--spans", help="Write per-job timing spans to this JSON lines file")
+    return parser.parse_args(argv)
+
+
+def list_models(index, language=None, sample_rate=None):
+    for entry in index.find(language=language, sample_rate=sample_rate, include_broken=True):
+        details = entry["error"] or (f"{entry['language']}  {entry['sample_rate']} Hz  "
+                                     f"{entry['quality'] or '-'}  {entry['speakers']} speaker(s)")
+        print(f"{entry['name']:<40} {entry['size'] / 1e6:7.1f}MB  {details}")
+
+
+def resolve_model(index, model):
+    """Absolute model path for a path or indexed voice name; raises ValueError with the reason"""
+    entry = index.get(model) or index.get(f"{model}.onnx")
+    if entry is None:
+        if not model or not os.path.exists(model):
+            raise ValueError(f"Model file not found: {model}")
+        return os.path.abspath(model)
+    if entry["error"]:
+        raise ValueError(f"Voice {entry['name']} can't be loaded: {entry['error']}")
+    return os.path.abspath(index.path(entry))
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    load_dotenv()
+
+    index = None
+    if os.path.isdir(args.models_dir):
+        index = ModelIndex(args.models_dir, log=lambda message: print(message, file=sys.stderr))
+        index.refresh()
+    if args.list_models:
+        if index is None:
+            print(f"Models directory not found: {args.models_dir}", file=sys.stderr)
+            return 2
+        list_models(index, args.language, args.sample_rate)
+        return 0
+    if not args.input:
+        print("An input directory or glob is required", file=sys.stderr)
+        return 2
+
+    api_key = None
+    model_file = None
+    if args.mode == "local":
+        try:
+            if index is not None:
+                model_file = resolve_model(index, args.model)
+            elif args.model and os.path.exists(args.model):
+                model_file = os.path.abspath(args.model)
+            else:
+                raise ValueError(f"Model file not found: {args.model}")
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 2
+    else:
+        api_key = os.getenv("NVIDIA_API_KEY")
+        if not api_key:
+            print("NVIDIA_API_KEY not found in .env file", file=sys.stderr)
+            return 2
+
+    inputs = collect_inputs(args.input)
+    if not inputs:
+        print(f"No text files match: {args.input}", file=sys.stderr)
+        return 2
+    outputs = {}
+    for text_file in inputs:
+        output_wav = output_path_for(text_file, args.output_dir, args.format, input_root(args.input))
+        if output_wav in outputs:
+            print(f"{text_file} and {outputs[output_wav]} would both write {output_wav}", file=sys.stderr)
+            return 2
+        outputs[output_wav] = text_file
+
+    settings = render_settings(args, model_file)
+    todo = []
+    for output_wav, text_file in outputs.items():
+        if args.output_dir:
+            os.makedirs(os.path.dirname(output_wav), exist_ok=True)
+        if args.force or not is_up_to_date(text_file, output_wav, settings):
+            todo.append((text_file, output_wav))
+    skipped = len(inputs) - len(todo)
+    workers = max(1, min(args.workers, len(todo) or 1))
+    print(f"{len(inputs)} files, {skipped} up to date, rendering {len(todo)} with {workers} workers")
+    rate_limit = os.getenv("TTS_API_RATE_LIMIT") if args.mode == "api" else None
+    if rate_limit:
+        rate_limit = float(rate_limit) / workers
+        print(f"Rate limit: {rate_limit:g} requests/s per worker")
+
+    failures = []
+    spans = []
+    audio_seconds = 0.0
+    file_bytes = wav_bytes = 0
+    encode_seconds = 0.0
+    rendered = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(args.mode, model_file, api_key, args.voice, args.verbose, args.output_rate, args.post,
+                  args.threads or threads_per_worker(workers), rate_limit),
+    ) as pool:
+        futures = {pool.submit(_render, i, text_file, output_wav): output_wav
+                   for i, (text_file, output_wav) in enumerate(todo, 1)}
+        for future in as_completed(futures):
+            text_file, stats, elapsed, error, job_spans = future.result()
+            spans.extend(job_spans)
+            if error:
+                failures.append((text_file, error))
+                print(f"FAILED {text_file}: {error}")
+            else:
+                save_settings(futures[future], settings)
+                rendered += 1
+                audio_seconds += stats["audio_seconds"]
+                file_bytes += stats["file_bytes"]
+                wav_bytes += stats["wav_bytes"]
+                encode_seconds += stats["encode_seconds"]
+                print(f"ok {text_file} ({stats['audio_seconds']:.1f}s audio in {elapsed:.2f}s)")
+    wall = time.perf_counter() - start
+
+    print()
+    print(f"Rendered:  {rendered}/{len(todo)} files in {wall:.2f}s ({skipped} skipped, {len(failures)} failed)")
+    if wall > 0:
+        print(f"Throughput: {rendered / wall:.2f} files/s, {audio_seconds / wall:.2f} audio s per wall s")
+    if wav_bytes:
+        print(f"Output:    {file_bytes / 1e6:.1f} MB {args.format} vs {wav_bytes / 1e6:.1f} MB as WAV "
+              f"({1 - file_bytes / wav_bytes:.0%} smaller), {encode_seconds:.2f}s spent encoding and writing")
+    for text_file, error in failures:
+        print(f"  failed: {text_file}: {error}")
+    if args.spans:
+        with open(args.spans, "w", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span, ensure_ascii=False) + "\n")
+        print(f"Wrote {len(spans)} timing spans to {args.spans}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+import os
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from audio_cache import get_segment_cache, model_fingerprint, piper_params
+from audio_output import FORMATS, open_writer
+from audio_post import post_processor_from_env
+from lang_segment import split_language_runs, voice_for_language
+from text_stream import DEFAULT_MAX_CHARS, iter_paragraph_sentences
+
+API_SAMPLE_RATE = 22050
+
+
+def iter_text(text_file, job, max_chars=DEFAULT_MAX_CHARS):
+    """Stream (sentence, paragraph_end) from a UTF-8 text file, updating job progress as it is read
+
+    Sentences longer than max_chars are split.
+    """
+    job.log(f"Streaming text from file: {text_file}")
+    sentences = job.timed_iter("text_read", iter_paragraph_sentences(text_file, max_chars))
+    for index, (sentence, fraction, paragraph_end) in enumerate(sentences):
+        job.check_cancelled()
+        if index == 0:
+            job.log(f"First sentence: {sentence[:100]}")
+        yield sentence, paragraph_end
+        job.set_progress(fraction)
+
+
+def open_job_writer(job, output_wav, sample_rate, output_rate=None):
+    """open_writer for a job's output; from here on a failed job removes the file it created"""
+    writer = open_writer(output_wav, sample_rate, output_rate, on_first_write=job.mark_first_audio)
+    job.output_created = True
+    return writer
+
+
+def log_cache_stats(cache, job, hits, lookups):
+    if cache is not None and lookups:
+        job.log(f"Segment cache: {hits}/{lookups} hits this job ({cache.stats_text()})")
+
+
+def write_segment(writer, post, pcm, boundary, job):
+    """Append one segment, post-processed first when post is set"""
+    if post is not None:
+        with job.span("post_process"):
+            pcm = post.process(pcm, boundary)
+    with job.span("audio_write"):
+        writer.write(pcm)
+
+
+def finish_output(writer, post, job):
+    if post is not None:
+        job.log(f"Post-processing: {post.stats_text()}")
+    job.log(writer.report())
+    return writer.stats()
+
+
+def synthesize_local(voice, text_file, output_wav, job, model_file=None, output_rate=None, post=None):
+    """Synthesize text_file with a loaded PiperVoice, appending audio sentence by sentence
+
+    When model_file is given, sentences are looked up in the segment cache by
+    the model's content hash first. The output is encoded by its extension,
+    resampled to output_rate if given; post (None = TTS_POST) turns on
+    audio_post clean-up. Returns the writer's stats.
+    """
+    sample_rate = voice.config.sample_rate
+    cache = get_segment_cache() if model_file else None
+    backend = f"piper:{model_fingerprint(model_file)}" if cache else None
+    params = piper_params(voice) if cache else None
+    hits = lookups = 0
+    post = post_processor_from_env(sample_rate, post)
+
+    with open_job_writer(job, output_wav, sample_rate, output_rate) as writer:
+        for sentence, paragraph_end in iter_text(text_file, job):
+            boundary = "paragraph" if paragraph_end else "sentence"
+            if cache is not None:
+                key = cache.key(sentence, backend, sample_rate, params)
+                pcm = cache.get(key)
+                lookups += 1
+                if pcm is not None:
+                    hits += 1
+                    write_segment(writer, post, pcm, boundary, job)
+                    continue
+            with job.span("synthesis"):
+                pcm = b"".join(chunk.audio_int16_bytes for chunk in voice.synthesize(sentence))
+            if cache is not None:
+                cache.put(key, pcm)
+            write_segment(writer, post, pcm, boundary, job)
+    log_cache_stats(cache, job, hits, lookups)
+    return finish_output(writer, post, job)
+
+
+def group_chunks(sentences, max_chars, boundary_every=4, job=None):
+    """Merge (sentence, paragraph_end) pairs into (text, language_code, boundary) chunks of up to max_chars
+
+    Each sentence is split into Chinese/English runs first, so mixed text is
+    read with the right language. Chunks also end after every paragraph and
+    after any sentence whose checksum is divisible by boundary_every. Those
+    boundaries depend only on the text itself, so an edit changes only the
+    chunk around it and the rest still hit the segment cache. boundary tells
+    how a chunk ends: "paragraph", "sentence" or None (mid-sentence).
+    """
+    parts, language_code, size, boundary = [], None, 0, None
+    for sentence, paragraph_end in sentences:
+        if job is not None:
+            with job.span("language_detection"):
+                runs = split_language_runs(sentence)
+        else:
+            runs = split_language_runs(sentence)
+        for index, (run, run_language) in enumerate(runs):
+            run = run.strip()
+            if parts and (run_language != language_code or size + len(run) > max_chars):
+                yield " ".join(parts), language_code, boundary
+                parts, size = [], 0
+            parts.append(run)
+            language_code = run_language
+            size += len(run) + 1
+            boundary = None
+            if index == len(runs) - 1:
+                boundary = "paragraph" if paragraph_end else "sentence"
+        if parts and (paragraph_end or zlib.crc32(sentence.encode("utf-8")) % boundary_every == 0):
+            yield " ".join(parts), language_code, boundary
+            parts, size = [], 0
+    if parts:
+        yield " ".join(parts), language_code, boundary
+
+
+def synthesize_api(text_file, output_wav, api_key, voice_name, job, output_rate=None, post=None):
+    """Synthesize text_file through the NVIDIA Magpie TTS gRPC API in concurrent chunks
+
+    Up to TTS_API_CONCURRENCY chunks of at most TTS_API_CHUNK_CHARS characters are
+    in flight at once, limited to TTS_API_RATE_LIMIT requests/s per process if
+    set. Audio is written strictly in text order; a failed chunk is retried on
+    its own, by the client only (TTS_API_RETRIES, retryable gRPC errors).
+    output_rate and post work as in synthesize_local; with post-processing on,
+    every sentence is its own chunk so each sentence end gets the configured
+    pause instead of the gap the server leaves inside a multi-sentence chunk.
+    Returns the writer's stats.
+    """
+    from riva_pool import endpoint_from_env, get_rate_limiter, get_tts_client
+
+    server_url, function_id, use_ssl = endpoint_from_env()
+    job.log(f"Using gRPC server: {server_url} ({'TLS' if use_ssl else 'plaintext'})")
+    job.log(f"Function ID: {function_id}")
+    # Channels are pooled, so only the first job per endpoint pays the TLS handshake
+    tts_client = get_tts_client(api_key)
+
+    concurrency = max(1, int(os.getenv("TTS_API_CONCURRENCY", "4")))
+    max_chars = int(os.getenv("TTS_API_CHUNK_CHARS", "400"))
+    rate_limit = os.getenv("TTS_API_RATE_LIMIT")
+    # One limiter per endpoint, so jobs running side by side share the limit
+    limiter = get_rate_limiter(burst=concurrency)
+    job.log(f"Concurrency: {concurrency}, chunk size: {max_chars} chars, rate limit: {rate_limit or 'none'}")
+
+    cache = get_segment_cache()
+    cache_hits = cache_lookups = 0
+    # Everything besides text, voice and language that goes into the request
+    request_params = {"server": server_url, "function_id": function_id, "encoding": "LINEAR_PCM"}
+    post = post_processor_from_env(API_SAMPLE_RATE, post)
+
+    def render(index, text, language_code):
+        """(pcm, cache_hit) for one chunk"""
+        run_voice = voice_for_language(voice_name, language_code)
+        if cache is not None:
+            key = cache.key(text, f"magpie:{run_voice}:{language_code}", API_SAMPLE_RATE, request_params)
+            pcm = cache.get(key)
+            if pcm is not None:
+                return pcm, True
+        pcm = request(index, text, run_voice, language_code)
+        if cache is not None:
+            cache.put(key, pcm)
+        return pcm, False
+
+    def write_next():
+        nonlocal cache_hits, cache_lookups
+        future, boundary = in_flight.popleft()
+        with job.span("synthesis_wait"):
+            pcm, hit = future.result()
+        cache_lookups += cache is not None
+        cache_hits += hit
+        write_segment(writer, post, pcm, boundary, job)
+
+    def request(index, text, run_voice, language_code):
+        def before_attempt():
+            # Every try, retries included, is cancellable and counts against the rate limit
+            job.check_cancelled()
+            limiter.acquire()
+
+        def log(message):
+            job.log(f"Chunk {index}: {message}")
+
+        with job.span("network"):
+            return tts_client.synthesize(
+                text=text,
+                voice_name=run_voice,
+                language_code=language_code,
+                sample_rate_hz=API_SAMPLE_RATE,
+                log=log,
+                before_attempt=before_attempt,
+            )
+
+    chunks_sent = 0
+    in_flight = deque()
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="tts-api")
+    try:
+        with open_job_writer(job, output_wav, API_SAMPLE_RATE, output_rate) as writer:
+            # Pauses are only controlled at chunk edges, so post-processing needs a chunk per sentence
+            boundary_every = 1 if post is not None else 4
+            sentences = iter_text(text_file, job, max_chars)
+            for text, language_code, boundary in group_chunks(sentences, max_chars, boundary_every, job=job):
+                in_flight.append((executor.submit(render, chunks_sent, text, language_code), boundary))
+                chunks_sent += 1
+                # Keep a bounded window of pending chunks and stitch them back in order
+                while len(in_flight) >= concurrency * 2:
+                    write_next()
+            while in_flight:
+                write_next()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    job.log(f"Audio saved successfully: {output_wav} ({chunks_sent} chunks)")
+    log_cache_stats(cache, job, cache_hits, cache_lookups)
+    return finish_output(writer, post, job)
+
+
+def output_path_for(text_file, output_dir=None, audio_format="wav", input_root=None):
+    """Output path next to text_file, or inside output_dir if given, with audio_format's extension
+
+    With input_root, text_file's path relative to it is mirrored under output_dir,
+    so files with the same name in different subdirectories don't collide.
+    """
+    base_name = os.path.splitext(text_file)[0]
+    if output_dir:
+        relative = os.path.relpath(base_name, input_root) if input_root else os.path.basename(base_name)
+        base_name = os.path.join(output_dir, relative)
+    return base_name + FORMATS[audio_format]
@@ -0,0 +1,197 @@
+import itertools
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when the user cancelled it"""
+
+
+class Job:
+    """One text file to render; updated by a worker thread, read by the UI"""
+
+    def __init__(self, job_id, text_file, output_wav, mode, events=None, log=None):
+        self.job_id = job_id
+        self.text_file = text_file
+        self.output_wav = output_wav
+        self.mode = mode
+        self.status = "queued"
+        self.progress = 0.0
+        self.error = None
+        self._events = events
+        self._log = log
+        self._cancel_event = threading.Event()
+        self.timings = {}  # stage -> [seconds, count]
+        self._timings_lock = threading.Lock()
+        self.started_at = time.perf_counter()
+        self.first_audio_at = None
+        self.output_created = False  # set once this job's writer has created output_wav
+
+    @property
+    def name(self):
+        return os.path.basename(self.text_file)
+
+    def _emit(self, kind, payload=None):
+        if self._events is not None:
+            self._events.put((kind, self, payload))
+
+    def log(self, message, level="INFO"):
+        """Report a debug message for this job"""
+        message = f"[job {self.job_id}] {message}"
+        if self._log:
+            self._log(message)
+        self._emit("log", (level, message))
+
+    def add_timing(self, stage, seconds):
+        with self._timings_lock:
+            total = self.timings.setdefault(stage, [0.0, 0])
+            total[0] += seconds
+            total[1] += 1
+
+    @contextmanager
+    def span(self, stage):
+        """Time the enclosed block and add it to this job's total for stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_timing(stage, time.perf_counter() - start)
+
+    def timed_iter(self, stage, iterable):
+        """Yield from iterable, charging the time spent producing each item to stage"""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_timing(stage, time.perf_counter() - start)
+                return
+            self.add_timing(stage, time.perf_counter() - start)
+            yield item
+
+    def timing_summary(self):
+        """One line of per-stage totals, e.g. 'total 2.10s | model_load 1.20s | synthesis 0.80s (3x)'"""
+        with self._timings_lock:
+            timings = sorted(self.timings.items(), key=lambda item: -item[1][0])
+        parts = []
+        for stage, (seconds, count) in timings:
+            parts.append(f"{stage} {seconds:.2f}s" + (f" ({count}x)" if count > 1 else ""))
+        return " | ".join(parts)
+
+    def span_records(self):
+        """Per-stage timing records for JSON lines export"""
+        with self._timings_lock:
+            timings = dict(self.timings)
+        return [
+            {"job": self.job_id, "file": self.text_file, "mode": self.mode, "status": self.status,
+             "stage": stage, "seconds": round(seconds, 6), "count": count}
+            for stage, (seconds, count) in timings.items()
+        ]
+
+    def mark_first_audio(self):
+        """Record time-to-first-audio the first time output audio is written"""
+        if self.first_audio_at is None:
+            self.first_audio_at = time.perf_counter()
+            self.add_timing("first_audio", self.first_audio_at - self.started_at)
+
+    def remove_partial_output(self):
+        """Delete output_wav after a failed or cancelled run, if this job created it"""
+        if not self.output_created:
+            return
+        try:
+            os.remove(self.output_wav)
+        except OSError:
+            pass
+
+    def set_status(self, status, error=None):
+        if status == "running":
+            self.started_at = time.perf_counter()
+        self.status = status
+        self.error = error
+        self._emit("status")
+
+    def set_progress(self, progress):
+        self.progress = max(0.0, min(1.0, progress))
+        self._emit("progress")
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self):
+        """Raise JobCancelled if cancel() was called; call between synthesis steps"""
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+
+
+class JobQueue:
+    """Runs synthesis jobs on a thread pool and reports back through an event queue
+
+    The Tk side never touches a job from a worker thread; it drains poll()
+    from a root.after() loop instead.
+    """
+
+    def __init__(self, max_workers=2):
+        self.max_workers = max_workers
+        self.events = queue.Queue()
+        self.jobs = []
+        self._ids = itertools.count(1)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tts-job")
+
+    def submit(self, text_file, output_wav, mode, run):
+        """Queue run(job) for text_file and return the Job"""
+        job = Job(next(self._ids), text_file, output_wav, mode, events=self.events)
+        self.jobs.append(job)
+        job._emit("status")
+        self._executor.submit(self._run, job, run)
+        return job
+
+    def _run(self, job, run):
+        if job.cancelled:
+            job.set_status("cancelled")
+            return
+        job.set_status("running")
+        try:
+            with job.span("total"):
+                run(job)
+        except JobCancelled:
+            job.log("Cancelled", level="WARNING")
+            job.remove_partial_output()
+            job.set_status("cancelled")
+        except Exception as e:
+            job.log(f"Error: {e}", level="ERROR")
+            job.remove_partial_output()
+            job.set_status("failed", error=str(e))
+        else:
+            job.set_progress(1.0)
+            job.set_status("done")
+        job.log(f"Timing: {job.timing_summary()}")
+        job._emit("spans", job.span_records())
+
+    def poll(self):
+        """Return all pending (kind, job, payload) events without blocking"""
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def active_jobs(self):
+        return [job for job in self.jobs if job.status in ("queued", "running")]
+
+    def cancel_all(self):
+        for job in self.active_jobs():
+            job.cancel()
+
+    def shutdown(self):
+        self.cancel_all()
+        self._executor.shutdown(wait=False, cancel_futures=True)
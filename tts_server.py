@@ -0,0 +1,443 @@
+"""Headless local synthesis service over HTTP
+
+    python tts_server.py --port 3002 --preload en_US-lessac-medium.onnx
+
+POST /api/nvidia/v1/tts (alias /api/tts) takes {text, voice, language} and
+answers {audio: base64 WAV, debug: {...}} like server.js, but renders with
+the local Piper voices in the models directory. POST /api/tts/stream takes
+the same body and returns a chunked audio/wav response, sending each
+sentence's audio as soon as it is rendered. GET /health/live,
+/health/ready and /metrics report liveness, readiness (preloaded voices are
+warm) and per-voice latency.
+"""
+import argparse
+import base64
+import io
+import json
+import os
+import statistics
+import struct
+import sys
+import threading
+import time
+import wave
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from audio_cache import get_segment_cache, model_fingerprint, piper_params
+from lang_segment import detect_language
+from model_index import ModelIndex
+from onnx_profile import load_voice
+from piper_batcher import BatcherClosed, PiperBatcher
+from text_stream import split_sentences
+from voice_cache import VoiceCache
+
+MAX_BODY_BYTES = 1024 * 1024
+# Sentences rendered ahead of the one being sent, per request
+LOOKAHEAD = 2
+
+
+def wav_bytes(pcm, sample_rate):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def streaming_wav_header(sample_rate):
+    """WAV header with unknown (maximum) lengths, as used for live streams"""
+    return (b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVEfmt "
+            + struct.pack("<IHHIIHH", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16)
+            + b"data" + struct.pack("<I", 0xFFFFFFFF))
+
+
+def _quantiles_ms(samples):
+    if not samples:
+        return None
+    if len(samples) == 1:
+        value = round(samples[0] * 1000, 1)
+        return {"p50": value, "p95": value, "p99": value}
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {"p50": round(cuts[49] * 1000, 1), "p95": round(cuts[94] * 1000, 1), "p99": round(cuts[98] * 1000, 1)}
+
+
+class VoiceMetrics:
+    """Rolling per-voice request latency, time to first audio and real-time factor"""
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._voices = {}
+        self._lock = threading.Lock()
+
+    def record(self, voice, elapsed, first_audio=None, audio_seconds=0.0, chars=0, error=False):
+        with self._lock:
+            stats = self._voices.get(voice)
+            if stats is None:
+                stats = self._voices[voice] = {
+                    "requests": 0, "errors": 0, "chars": 0, "audio_seconds": 0.0, "busy_seconds": 0.0,
+                    "latency": deque(maxlen=self.window), "first_audio": deque(maxlen=self.window),
+                }
+            stats["requests"] += 1
+            if error:
+                stats["errors"] += 1
+                return
+            stats["chars"] += chars
+            stats["audio_seconds"] += audio_seconds
+            stats["busy_seconds"] += elapsed
+            stats["latency"].append(elapsed)
+            if first_audio is not None:
+                stats["first_audio"].append(first_audio)
+
+    def snapshot(self):
+        with self._lock:
+            return {voice: {
+                "requests": stats["requests"],
+                "errors": stats["errors"],
+                "latency_ms": _quantiles_ms(list(stats["latency"])),
+                "first_audio_ms": _quantiles_ms(list(stats["first_audio"])),
+                "rtf": round(stats["busy_seconds"] / stats["audio_seconds"], 4) if stats["audio_seconds"] else None,
+                "chars_per_second": round(stats["chars"] / stats["busy_seconds"], 1) if stats["busy_seconds"] else None,
+            } for voice, stats in self._voices.items()}
+
+
+class RequestError(Exception):
+    """A request the service can't serve; status is the HTTP status to answer with"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class TTSService:
+    """Warm voices, a synthesis worker pool and the metrics the HTTP layer reports"""
+
+    def __init__(self, models_dir, workers=None, max_voices=4, default_voice=None, log=None, loader=None,
+                 batch_wait_ms=None, max_batch=8):
+        self.log = log or (lambda message: None)
+        self.index = ModelIndex(models_dir, log=self.log)
+        self.index.refresh()
+        # Voices are shared between pool threads; piper serializes espeak phonemization itself
+        loader = loader or (lambda model_file: load_voice(model_file, log=self.log))
+        self.voices = VoiceCache(max_voices=max_voices, loader=loader, log=self.log)
+        self.workers = workers or os.cpu_count() or 4
+        self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="tts")
+        self.cache = get_segment_cache()
+        self.metrics = VoiceMetrics()
+        self.default_voice = default_voice
+        self.ready = threading.Event()
+        self.preload_errors = {}
+        # With batch_wait_ms, concurrent sentences for a voice share ONNX runs
+        self.batch_wait_ms = batch_wait_ms
+        self.max_batch = max_batch
+        self._batchers = {}  # model name -> PiperBatcher
+        self._batchers_lock = threading.Lock()
+
+    def preload(self, names):
+        """Load the named voices in the background; the service is ready once they are warm"""
+        def run():
+            for name in names:
+                try:
+                    self.voices.get(self.model_path(name))
+                    self.log(f"Preloaded {name}")
+                except Exception as e:
+                    self.preload_errors[name] = str(e)
+                    self.log(f"Preload failed for {name}: {e}")
+            self.ready.set()
+
+        threading.Thread(target=run, name="tts-preload", daemon=True).start()
+
+    def _entry(self, name):
+        return self.index.get(name) or self.index.get(f"{name}.onnx")
+
+    def model_path(self, name):
+        entry = self._entry(name)
+        if entry is None or entry["error"]:
+            raise RequestError(404, f"Unknown voice: {name}")
+        return self.index.path(entry)
+
+    def resolve(self, voice, language, text):
+        """(model_name, model_path, language_code) for a request
+
+        voice may name a local model; anything else (e.g. a Magpie voice name)
+        falls back to the default voice or the first local voice for the
+        language. Like server.js, "en-US" or no language means auto-detect.
+        """
+        if not language or language == "en-US":
+            language = detect_language(text)
+        if voice and self._entry(voice):
+            return self._entry(voice)["name"], self.model_path(voice), language
+        candidates = self.index.find(language=language) or self.index.find(language=language.split("-")[0])
+        for entry in candidates:
+            if self.default_voice and self._entry(self.default_voice) is entry:
+                return entry["name"], self.index.path(entry), language
+        if not candidates:
+            raise RequestError(404, f"No local voice for language {language}")
+        return candidates[0]["name"], self.index.path(candidates[0]), language
+
+    def _batcher(self, name, voice):
+        with self._batchers_lock:
+            batcher = self._batchers.get(name)
+            if batcher is None or batcher.voice is not voice:
+                # New voice, or the cached one was reloaded
+                if batcher is not None:
+                    batcher.close()
+                batcher = self._batchers[name] = PiperBatcher(voice, self.max_batch, self.batch_wait_ms, self.log)
+            return batcher
+
+    def batch_stats(self):
+        with self._batchers_lock:
+            return {name: batcher.stats() for name, batcher in self._batchers.items()}
+
+    def _render(self, name, voice, backend, sentence):
+        """(pcm, cache_hit) for one sentence, on a pool thread"""
+        sample_rate = voice.config.sample_rate
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(sentence, backend, sample_rate, piper_params(voice))
+            pcm = self.cache.get(key)
+            if pcm is not None:
+                return pcm, True
+        pcm = None
+        if self.batch_wait_ms:
+            try:
+                pcm = self._batcher(name, voice).synthesize(sentence)
+            except BatcherClosed:
+                # The batcher was replaced mid-request; render this sentence on its own
+                pass
+        if pcm is None:
+            pcm = b"".join(chunk.audio_int16_bytes for chunk in voice.synthesize(sentence))
+        if key is not None:
+            self.cache.put(key, pcm)
+        return pcm, False
+
+    def synthesize(self, text, voice=None, language=None):
+        """Start a request; returns (info, pcm_iterator)
+
+        Sentences are rendered on the pool up to LOOKAHEAD ahead of the
+        consumer and yielded in order. info is filled in as the iterator runs
+        and the request is recorded in the metrics when it finishes.
+        """
+        if not text or not text.strip():
+            raise RequestError(400, "Text is required")
+        name, model_file, language = self.resolve(voice, language, text)
+        voice_model = self.voices.get(model_file)
+        backend = f"piper:{model_fingerprint(model_file)}"
+        sentences = split_sentences(text)
+        info = {"voice": name, "language": language, "sampleRate": voice_model.config.sample_rate,
+                "sentences": len(sentences), "cacheHits": 0}
+
+        def iterate():
+            start = time.perf_counter()
+            first_audio = None
+            audio_bytes = 0
+            pending = deque()
+            remaining = iter(sentences)
+            try:
+                while True:
+                    while len(pending) < LOOKAHEAD:
+                        sentence = next(remaining, None)
+                        if sentence is None:
+                            break
+                        pending.append(self.pool.submit(self._render, name, voice_model, backend, sentence))
+                    if not pending:
+                        break
+                    pcm, hit = pending.popleft().result()
+                    info["cacheHits"] += hit
+                    if first_audio is None:
+                        first_audio = time.perf_counter() - start
+                    audio_bytes += len(pcm)
+                    yield pcm
+            except BaseException:
+                for future in pending:
+                    future.cancel()
+                self.metrics.record(name, time.perf_counter() - start, error=True)
+                raise
+            elapsed = time.perf_counter() - start
+            audio_seconds = audio_bytes / 2 / info["sampleRate"]
+            info.update(elapsedMs=round(elapsed * 1000, 1), firstAudioMs=round((first_audio or elapsed) * 1000, 1),
+                        audioSeconds=round(audio_seconds, 3))
+            self.metrics.record(name, elapsed, first_audio, audio_seconds, len(text))
+
+        return info, iterate()
+
+    def health(self):
+        return {
+            "ready": self.ready.is_set() and not self.preload_errors,
+            "voices": len(self.index.find()),
+            "warm": self.voices.stats_text(),
+            "preloadErrors": self.preload_errors,
+        }
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        with self._batchers_lock:
+            for batcher in self._batchers.values():
+                batcher.close()
+
+
+class Handler(BaseHTTPRequestHandler):
+    # Needed for chunked responses and keep-alive
+    protocol_version = "HTTP/1.1"
+    server_version = "LocalTTS/1.0"
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        self.service.log(f"{self.address_string()} {format % args}")
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise RequestError(413, "Request body too large")
+        try:
+            return json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            raise RequestError(400, "Body must be JSON")
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
+        self.send_header("Access-Control-Allow-Headers", "Content-Type")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        if self.path == "/health/live":
+            self.send_json(200, {"live": True})
+        elif self.path == "/health/ready":
+            health = self.service.health()
+            self.send_json(200 if health["ready"] else 503, health)
+        elif self.path == "/metrics":
+            metrics = self.service.metrics.snapshot()
+            if self.service.batch_wait_ms:
+                for name, stats in self.service.batch_stats().items():
+                    metrics.setdefault(name, {})["batching"] = stats
+            self.send_json(200, metrics)
+        else:
+            self.send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        try:
+            if self.path in ("/api/tts", "/api/nvidia/v1/tts"):
+                self.synthesize()
+            elif self.path == "/api/tts/stream":
+                self.synthesize_stream()
+            else:
+                self.send_json(404, {"error": "Not found"})
+        except RequestError as e:
+            self.send_json(e.status, {"error": str(e)})
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        except Exception as e:
+            self.service.log(f"Synthesis failed: {e}")
+            self.send_json(500, {"error": str(e)})
+
+    def _start(self):
+        body = self.read_json()
+        return self.service.synthesize(body.get("text"), body.get("voice"), body.get("language"))
+
+    def synthesize(self):
+        info, pcm_iter = self._start()
+        pcm = b"".join(pcm_iter)
+        info.update(encoding="LINEAR_PCM", addedWavHeader=True)
+        self.send_json(200, {
+            "audio": base64.b64encode(wav_bytes(pcm, info["sampleRate"])).decode("ascii"),
+            "debug": info,
+        })
+
+    def synthesize_stream(self):
+        info, pcm_iter = self._start()
+        # Render the first sentence before committing to a 200, so errors still get a JSON answer
+        first = next(pcm_iter, b"")
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/wav")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("X-Voice", info["voice"])
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        try:
+            self.write_chunk(streaming_wav_header(info["sampleRate"]) + first)
+            for pcm in pcm_iter:
+                self.write_chunk(pcm)
+            self.wfile.write(b"0\r\n\r\n")
+        except Exception as e:
+            # Headers are gone; all we can do is drop the connection
+            pcm_iter.close()
+            self.close_connection = True
+            if not isinstance(e, (BrokenPipeError, ConnectionResetError)):
+                self.service.log(f"Stream aborted: {e}")
+
+    def write_chunk(self, data):
+        if data:
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve local Piper synthesis over HTTP")
+    parser.add_argument("--host", default=os.getenv("TTS_SERVER_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("TTS_SERVER_PORT", "3002")))
+    parser.add_argument("--models-dir", default=os.path.join(os.getcwd(), "models"), help="Voice library to serve")
+    parser.add_argument("-j", "--workers", type=int, default=int(os.getenv("TTS_SERVER_WORKERS", "0")) or None,
+                        help="Synthesis threads (default: CPU count)")
+    parser.add_argument("--max-voices", type=int, default=int(os.getenv("TTS_VOICE_CACHE_MAX", "4")),
+                        help="Voices kept loaded")
+    parser.add_argument("--voice", default=os.getenv("TTS_SERVER_VOICE"),
+                        help="Voice used when a request names no local voice")
+    parser.add_argument("--batch-ms", type=float, default=float(os.getenv("TTS_SERVER_BATCH_MS", "0")),
+                        help="Micro-batch window for concurrent sentences of one voice (0 = off)")
+    parser.add_argument("--max-batch", type=int, default=int(os.getenv("TTS_SERVER_MAX_BATCH", "8")),
+                        help="Most sentences per batched inference")
+    parser.add_argument("--preload", action="append", default=[], help="Voice to load at startup, repeatable")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log every request")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not os.path.isdir(args.models_dir):
+        print(f"Models directory not found: {args.models_dir}", file=sys.stderr)
+        return 2
+
+    def log(message):
+        print(f"[{time.strftime('%H:%M:%S')}] {message}", file=sys.stderr)
+
+    service = TTSService(args.models_dir, workers=args.workers, max_voices=args.max_voices,
+                         default_voice=args.voice, log=log if args.verbose else None,
+                         batch_wait_ms=args.batch_ms, max_batch=args.max_batch)
+    preload = args.preload or ([args.voice] if args.voice else [])
+    service.preload(preload)
+
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    server.daemon_threads = True
+    server.service = service
+    log(f"Serving {len(service.index.find())} voices on http://{args.host}:{args.port} "
+        f"(workers {service.workers}, preloading {', '.join(preload) or 'nothing'})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+import os
+import threading
+from collections import OrderedDict
+
+
+def _default_loader(model_file):
+    from onnx_profile import load_voice
+    return load_voice(model_file)
+
+
+def estimate_voice_bytes(model_file):
+    """Rough resident size of a loaded voice: the .onnx weights plus its .json config"""
+    size = os.path.getsize(model_file)
+    config_file = f"{model_file}.json"
+    if os.path.exists(config_file):
+        size += os.path.getsize(config_file)
+    return size
+
+
+class VoiceCache:
+    """In-memory LRU cache of loaded PiperVoice models keyed by model path and mtime
+
+    Either limit (max_voices, max_bytes) may be None to disable it. The most
+    recently used voice is always kept, even if it alone exceeds max_bytes.
+    """
+
+    def __init__(self, max_voices=2, max_bytes=None, loader=None, log=None):
+        self.max_voices = max_voices
+        self.max_bytes = max_bytes
+        self.loader = loader or _default_loader
+        self.log = log or (lambda message: None)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._voices = OrderedDict()  # (path, mtime) -> (voice, size)
+        self._lock = threading.Lock()
+        self._loading = {}  # (path, mtime) -> threading.Event
+
+    def _key(self, model_file):
+        path = os.path.abspath(model_file)
+        return path, os.path.getmtime(path)
+
+    def get(self, model_file):
+        """Return a loaded voice for model_file, loading it on a miss"""
+        key = self._key(model_file)
+        while True:
+            with self._lock:
+                if key in self._voices:
+                    self._voices.move_to_end(key)
+                    self.hits += 1
+                    self.log(f"Voice cache hit: {os.path.basename(key[0])} ({self.stats_text()})")
+                    return self._voices[key][0]
+                pending = self._loading.get(key)
+                if pending is None:
+                    # This caller does the load; concurrent callers wait for it
+                    pending = threading.Event()
+                    self._loading[key] = pending
+                    self.misses += 1
+                    break
+            pending.wait()
+
+        try:
+            self.log(f"Voice cache miss: loading {os.path.basename(key[0])} ({self.stats_text()})")
+            voice = self.loader(key[0])
+            size = estimate_voice_bytes(key[0])
+            with self._lock:
+                # Drop stale entries for the same path (the file changed on disk)
+                for old_key in [k for k in self._voices if k[0] == key[0]]:
+                    del self._voices[old_key]
+                self._voices[key] = (voice, size)
+                self._evict()
+            return voice
+        finally:
+            with self._lock:
+                del self._loading[key]
+            pending.set()
+
+    def preload(self, model_file):
+        """Load model_file into the cache in a background thread"""
+        def run():
+            try:
+                self.get(model_file)
+            except Exception as e:
+                self.log(f"Voice preload failed for {os.path.basename(model_file)}: {e}")
+
+        thread = threading.Thread(target=run, name="voice-preload", daemon=True)
+        thread.start()
+        return thread
+
+    def _evict(self):
+        # Caller holds self._lock
+        while len(self._voices) > 1:
+            over_count = self.max_voices is not None and len(self._voices) > self.max_voices
+            over_bytes = self.max_bytes is not None and self.total_bytes() > self.max_bytes
+            if not (over_count or over_bytes):
+                break
+            (path, _), _ = self._voices.popitem(last=False)
+            self.evictions += 1
+            self.log(f"Voice cache evicted: {os.path.basename(path)}")
+
+    def total_bytes(self):
+        return sum(size for _, size in self._voices.values())
+
+    def clear(self):
+        with self._lock:
+            self._voices.clear()
+
+    def stats_text(self):
+        return (f"hits={self.hits} misses={self.misses} evictions={self.evictions} "
+                f"cached={len(self._voices)} size={self.total_bytes() / 1e6:.1f}MB")